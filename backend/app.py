@@ -11,9 +11,12 @@ import subprocess
 import platform
 import socket
 import shutil
+import re
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Literal, Optional
 
 # Unbuffer stdout for real-time logging
 sys.stdout.reconfigure(line_buffering=True)
@@ -32,7 +35,7 @@ print("🚀 SIGMA-OS Backend Starting...", flush=True)
 
 # Try to import automation features (optional - won't break if missing)
 try:
-    from backend.db import engine, Base
+    from backend.db import engine, Base, optimize_database
     from backend.models import AutomationWorkflow, AutomationTask
     AUTOMATION_AVAILABLE = True
     print("✅ Automation features enabled", flush=True)
@@ -71,12 +74,28 @@ app.add_middleware(
 # Global state
 agents = {}
 workflow_engine = None
-active_websockets: List[WebSocket] = []
+active_clients: Dict[WebSocket, asyncio.Queue] = {}
+event_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Agents and model clients are synchronous - run them off the event loop
+EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="sigma-agent")
+# Ask-mode model calls get their own small pool - a timed-out call keeps its
+# thread until the provider answers, and must not starve agent runs
+ASK_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="sigma-ask")
+
+# Concurrent runs allowed per agent. Each agent is a single shared instance:
+# web runs share one browser/page and email shares one (non-thread-safe)
+# Gmail service and its OAuth init, so those two run one task at a time.
+AGENT_CONCURRENCY = {"system": 8, "email": 1, "web": 1}
+AGENT_TIMEOUT = 120.0  # seconds a request waits for an agent run
+ASK_TIMEOUT = 60.0  # seconds a request waits for an Ask-mode answer
+agent_semaphores: Dict[str, asyncio.Semaphore] = {}
 
 # Models
 class CommandRequest(BaseModel):
     command: str
     mode: str = "agent"
+    agent: Optional[Literal["system", "email", "web"]] = None  # skips routing when set; anything else is a 422
 
 class CommandResponse(BaseModel):
     success: bool
@@ -91,6 +110,31 @@ SYSTEM_NETWORK_KEYWORDS = {
     "interface", "latency", "bandwidth", "ethernet", "wifi", "port"
 }
 
+# Agent routing patterns, compiled once (prefix matches keep e.g. "gmail" -> email).
+# A bare URL is not enough for web - "git clone https://..." and "curl https://..."
+# are shell commands - so URLs only count next to a browse/open verb.
+EMAIL_ROUTE_RE = re.compile(r"mail|\binbox\b|\bsend\b.*@", re.IGNORECASE)
+WEB_ROUTE_RE = re.compile(
+    r"\b(?:web|browser|browse|search|scrape|crawl|open url)"
+    r"|\b(?:open|visit|go to|navigate to)\b.*https?://",
+    re.IGNORECASE,
+)
+
+
+def _route_command(command: str) -> str:
+    """Pick the agent for a command, memoized on the normalized command text."""
+    return _route_normalized(" ".join(command.lower().split()))
+
+
+@lru_cache(maxsize=1024)
+def _route_normalized(command: str) -> str:
+    """Single regex pass per agent - no LLM call."""
+    if EMAIL_ROUTE_RE.search(command):
+        return 'email'
+    if WEB_ROUTE_RE.search(command):
+        return 'web'
+    return 'system'  # Default to system for 99% of tasks
+
 
 def _safe_run(command: List[str], timeout: float = 2.0) -> str:
     """Run a local read-only command safely and return output text."""
@@ -225,6 +269,89 @@ def _format_snapshot_fallback(snapshot: Dict[str, Any]) -> str:
         lines.append(str(network.get("interfaces")))
     return "\n".join(lines)
 
+# Fast JSON for websocket frames (optional - falls back to stdlib json)
+try:
+    import orjson
+
+    def dumps_message(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+except ImportError:
+    dumps_message = json.dumps
+
+# Max pending messages per client before it is considered too slow and dropped
+WS_QUEUE_SIZE = 256
+
+# Queue marker telling a client's writer to close the socket (slow client)
+WS_CLOSE = object()
+
+
+def broadcast_update(update: AgentUpdate):
+    """Queue an agent update for every client (runs on the server loop)"""
+    message = dumps_message(update.to_dict())
+    for ws, queue in list(active_clients.items()):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Back-pressure: disconnect slow clients instead of buffering forever.
+            # Pending messages are dropped so the writer sees the close marker next.
+            active_clients.pop(ws, None)
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(WS_CLOSE)
+
+
+def on_agent_update(update: AgentUpdate):
+    """Agent callback - agents are sync, so hand the broadcast to the server loop"""
+    if event_loop is None or not active_clients:
+        return
+    event_loop.call_soon_threadsafe(broadcast_update, update)
+
+
+async def _run_agent(agent_name: str, agent, command: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    """Run an agent in the worker pool, bounded per agent type and by AGENT_TIMEOUT
+    
+    The deadline covers waiting for a free slot as well as the run itself, so a
+    hung run fails later requests with a timeout instead of queueing them forever.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + AGENT_TIMEOUT
+    semaphore = agent_semaphores[agent_name]
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=AGENT_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"{agent_name} agent is busy - no free slot within {AGENT_TIMEOUT:.0f}s")
+    try:
+        job = EXECUTOR.submit(agent.run, command, context)
+    except Exception:
+        semaphore.release()
+        raise
+    # A timed-out run keeps going in its thread - hold the slot until it really ends
+    job.add_done_callback(lambda _: loop.call_soon_threadsafe(semaphore.release))
+    try:
+        return await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(job)),
+            timeout=max(deadline - loop.time(), 0)
+        )
+    except asyncio.TimeoutError:
+        # Drop the run if it is still queued, so it can't execute after we reported failure
+        job.cancel()
+        raise TimeoutError(f"{agent_name} agent did not finish within {AGENT_TIMEOUT:.0f}s")
+
+
+async def _writer_loop(websocket: WebSocket, queue: asyncio.Queue):
+    """Drain a client's queue - the only task that writes to its socket"""
+    while True:
+        message = await queue.get()
+        try:
+            if message is WS_CLOSE:
+                await websocket.close(code=1013)
+                return
+            await websocket.send_text(message)
+        except Exception:
+            # Socket already gone - stop broadcasting to it
+            active_clients.pop(websocket, None)
+            return
+
 # Initialize agents
 def init_agents():
     """Initialize all agents"""
@@ -232,24 +359,16 @@ def init_agents():
     print("🤖 INITIALIZING INTELLIGENT AGENTS", flush=True)
     print("="*80, flush=True)
     
-    def broadcast_update(update: AgentUpdate):
-        message = json.dumps(update.to_dict())
-        for ws in active_websockets:
-            try:
-                asyncio.create_task(ws.send_text(message))
-            except:
-                pass
-    
     print("   Creating System Agent...", flush=True)
-    agents['system'] = SystemAgent(update_callback=broadcast_update)
+    agents['system'] = SystemAgent(update_callback=on_agent_update)
     print("   ✅ System Agent ready", flush=True)
     
     print("   Creating Email Agent...", flush=True)
-    agents['email'] = EmailAgent(update_callback=broadcast_update)
+    agents['email'] = EmailAgent(update_callback=on_agent_update)
     print("   ✅ Email Agent ready", flush=True)
     
     print("   Creating Web Agent...", flush=True)
-    agents['web'] = WebAgent(update_callback=broadcast_update)
+    agents['web'] = WebAgent(update_callback=on_agent_update)
     print("   ✅ Web Agent ready", flush=True)
     
     # Initialize workflow engine
@@ -265,6 +384,9 @@ def init_agents():
 @app.on_event("startup")
 async def on_startup():
     """Initialize agents on startup - keep it fast!"""
+    global event_loop
+    event_loop = asyncio.get_running_loop()
+    agent_semaphores.update({name: asyncio.Semaphore(limit) for name, limit in AGENT_CONCURRENCY.items()})
     
     # Initialize agents first (core functionality)
     init_agents()
@@ -279,7 +401,17 @@ async def on_startup():
     
     print("✅ SIGMA-OS ready!")
 
-init_agents()
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Release worker threads and tidy the database"""
+    EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    ASK_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    
+    if AUTOMATION_AVAILABLE:
+        try:
+            optimize_database()
+        except Exception as e:
+            print(f"⚠️  Database maintenance skipped: {e}")
 
 # Health check
 @app.get("/health")
@@ -362,7 +494,10 @@ async def execute_command(request: CommandRequest):
     try:
         # Ask mode: answer directly without executing system/web/email actions.
         if mode == "ask":
-            snapshot = _collect_system_network_snapshot() if _is_system_network_query(command) else None
+            loop = asyncio.get_running_loop()
+            snapshot = None
+            if _is_system_network_query(command):
+                snapshot = await loop.run_in_executor(ASK_EXECUTOR, _collect_system_network_snapshot)
 
             ask_prompt = (
                 "You are SIGMA-OS in Ask mode. "
@@ -381,7 +516,10 @@ async def execute_command(request: CommandRequest):
 
             ask_text = ""
             try:
-                ask_response = model_manager.get_thinking_model().generate_content(ask_prompt)
+                ask_response = await asyncio.wait_for(
+                    loop.run_in_executor(ASK_EXECUTOR, model_manager.get_thinking_model().generate_content, ask_prompt),
+                    timeout=ASK_TIMEOUT
+                )
                 ask_text = getattr(ask_response, "text", "") or ""
             except Exception:
                 ask_text = ""
@@ -413,24 +551,15 @@ async def execute_command(request: CommandRequest):
                 thinking_process="Answered directly in Ask mode"
             )
 
-        # Route to best agent (99% of time it's system agent)
-        if any(word in command.lower() for word in ['email', 'mail', 'send email']):
-            agent_name = 'email'
-        elif any(word in command.lower() for word in ['web', 'browser', 'search', 'website']):
-            agent_name = 'web'
-        else:
-            agent_name = 'system'  # Default to system for 99% of tasks
-        
-        agent = agents.get(agent_name, agents['system'])
+        # Caller-picked agent, otherwise route to best agent (99% of time it's system agent)
+        agent_name = request.agent or _route_command(command)
+        agent = agents[agent_name]
         
         print(f"🎯 Using Agent: {agent_name.upper()}", flush=True)
         print(f"⚡ Executing...", flush=True)
         
-        # Execute
-        result = agent.run(
-            task=command,
-            context={"mode": mode, "command": command}
-        )
+        # Execute in the worker pool so websocket updates keep flowing
+        result = await _run_agent(agent_name, agent, command, {"mode": mode, "command": command})
         
         print(f"✅ Execution complete!", flush=True)
         print(f"   Success: {result.get('success', False)}", flush=True)
@@ -505,26 +634,29 @@ async def execute_command(request: CommandRequest):
 async def websocket_endpoint(websocket: WebSocket):
     """Real-time agent updates"""
     await websocket.accept()
-    active_websockets.append(websocket)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=WS_QUEUE_SIZE)
+    writer = asyncio.create_task(_writer_loop(websocket, queue))
+    active_clients[websocket] = queue
     
     try:
-        await websocket.send_json({
+        queue.put_nowait(dumps_message({
             "type": "connection",
             "message": "Connected to SIGMA-OS",
             "agents": list(agents.keys())
-        })
+        }))
         
         while True:
             data = await websocket.receive_text()
             if data == "ping":
-                await websocket.send_text("pong")
+                queue.put_nowait("pong")
                 
     except WebSocketDisconnect:
-        active_websockets.remove(websocket)
+        pass
     except Exception as e:
         print(f"WebSocket error: {e}")
-        if websocket in active_websockets:
-            active_websockets.remove(websocket)
+    finally:
+        active_clients.pop(websocket, None)
+        writer.cancel()
 
 # Startup message
 if __name__ == "__main__":
@@ -533,4 +665,6 @@ if __name__ == "__main__":
     print("   HTTP: http://localhost:5000")
     print("   WebSocket: ws://localhost:5000/ws\n")
     
-    uvicorn.run(app, host="0.0.0.0", port=5000)
+    # Updates are small JSON frames serialized once per broadcast - per-client
+    # permessage-deflate would recompress the same frame for every socket
+    uvicorn.run(app, host="0.0.0.0", port=5000, ws_per_message_deflate=False)
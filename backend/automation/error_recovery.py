@@ -1,6 +1,7 @@
 """Enhanced Error Recovery - Auto-retry with intelligent backoff strategies"""
 
 import asyncio
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, Callable, Optional
 from enum import Enum
@@ -256,7 +257,7 @@ class ErrorRecovery:
         if breaker["state"] == "open":
             # Check if timeout elapsed
             if breaker["opened_at"]:
-                elapsed = (datetime.utcnow() - breaker["opened_at"]).total_seconds()
+                elapsed = time.monotonic() - breaker["opened_at"]
                 if elapsed > breaker["timeout"]:
                     # Half-open: allow one retry
                     breaker["state"] = "half-open"
@@ -276,7 +277,7 @@ class ErrorRecovery:
         
         if breaker["failures"] >= breaker["threshold"]:
             breaker["state"] = "open"
-            breaker["opened_at"] = datetime.utcnow()
+            breaker["opened_at"] = time.monotonic()
             print(f"🔴 Circuit breaker OPEN for context: {context}")
     
     def set_custom_policy(self, context: str, policy: RetryPolicy):
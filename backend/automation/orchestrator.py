@@ -1,11 +1,16 @@
 """Agent Orchestrator - Coordinate and manage multiple agents"""
 
 import asyncio
+import time
 from datetime import datetime
 from typing import Dict, Any, List, Optional, Callable
-from collections import defaultdict
+from collections import defaultdict, deque
+from itertools import islice
 import json
 
+# Messages kept for get_message_history - older ones are dropped
+MESSAGE_HISTORY_SIZE = 10000
+
 
 class AgentMessage:
     """Message passed between agents"""
@@ -63,7 +68,7 @@ class AgentOrchestrator:
         self.agents: Dict[str, Any] = {}  # agent_name -> agent instance
         self.capabilities: Dict[str, List[AgentCapability]] = {}  # agent_name -> capabilities
         self.message_queues: Dict[str, asyncio.Queue] = {}  # agent_name -> message queue
-        self.message_history: List[AgentMessage] = []
+        self.message_history: deque = deque(maxlen=MESSAGE_HISTORY_SIZE)
         self.agent_stats: Dict[str, Dict[str, Any]] = defaultdict(lambda: {
             "tasks_completed": 0,
             "tasks_failed": 0,
@@ -189,7 +194,7 @@ class AgentOrchestrator:
         
         print(f"🎯 Routing task to agent: {agent_name}")
         
-        start_time = datetime.utcnow()
+        start_time = time.perf_counter()
         
         try:
             # Execute task
@@ -202,7 +207,7 @@ class AgentOrchestrator:
             
             # Update stats
             stats["tasks_completed"] += 1
-            response_time = (datetime.utcnow() - start_time).total_seconds()
+            response_time = time.perf_counter() - start_time
             self._update_avg_response_time(agent_name, response_time)
             
             return {
@@ -358,4 +363,5 @@ class AgentOrchestrator:
     
     def get_message_history(self, limit: int = 50) -> List[Dict[str, Any]]:
         """Get recent message history"""
-        return [msg.to_dict() for msg in self.message_history[-limit:]]
+        start = max(0, len(self.message_history) - limit)
+        return [msg.to_dict() for msg in islice(self.message_history, start, None)]
@@ -1,13 +1,26 @@
 """SIGMA-OS Intelligent Agent System"""
 
 from .agent_core import IntelligentAgent, AgentStatus, AgentUpdate
-from .system_agent import SystemAgent
-from .email_agent import EmailAgent
-from .web_agent import WebAgent
+
+# Agents are imported on first access (PEP 562) - importing a submodule such as
+# model_manager shouldn't pay for loading every agent and its dependencies.
+_LAZY_AGENTS = {
+    'SystemAgent': '.system_agent',
+    'EmailAgent': '.email_agent',
+    'WebAgent': '.web_agent',
+}
+
+def __getattr__(name):
+    if name in _LAZY_AGENTS:
+        from importlib import import_module
+        value = getattr(import_module(_LAZY_AGENTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     'IntelligentAgent',
-    'AgentStatus', 
+    'AgentStatus',
     'AgentUpdate',
     'SystemAgent',
     'EmailAgent',
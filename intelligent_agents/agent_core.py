@@ -5,10 +5,16 @@ Supports multiple AI models with hot-swapping
 """
 
 import os
+import re
+import copy
 import json
 import time
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field
 from enum import Enum
 from dotenv import load_dotenv
 
@@ -17,6 +23,28 @@ load_dotenv()
 # Import model manager
 from .model_manager import model_manager
 
+# Fenced code block in LLM output (```json ... ``` or bare ```)
+FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.S)
+
+# Plans from successful runs, reused for identical tasks (skips the planning LLM call)
+PLAN_CACHE_SIZE = 128
+
+# Past failures kept for self-healing context (only the last few go into prompts)
+ERROR_MEMORY_SIZE = 50
+
+_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+@lru_cache(maxsize=64)
+def _dumps_items(items: tuple) -> str:
+    return json.dumps({key: value for key, _, value in items}, indent=2)
+
+def dumps_context(context: Dict[str, Any]) -> str:
+    """json.dumps(context, indent=2), memoized for flat contexts that recur across prompts"""
+    if all(type(key) is str and type(value) in _SCALAR_TYPES for key, value in context.items()):
+        # The value type is part of the key - True, 1 and 1.0 hash alike but dump differently
+        return _dumps_items(tuple((key, type(value), value) for key, value in context.items()))
+    return json.dumps(context, indent=2)  # nested values - serialize directly
+
 class AgentStatus(Enum):
     IDLE = "idle"
     THINKING = "thinking"
@@ -25,7 +53,7 @@ class AgentStatus(Enum):
     ERROR = "error"
     RETRYING = "retrying"
 
-@dataclass
+@dataclass(slots=True)
 class AgentUpdate:
     """Real-time update from agent to UI"""
     agent_name: str
@@ -34,12 +62,17 @@ class AgentUpdate:
     thinking_process: Optional[str] = None
     action_taken: Optional[str] = None
     progress: Optional[int] = None  # 0-100
-    timestamp: float = time.time()
+    timestamp: float = field(default_factory=time.time)
     
     def to_dict(self):
+        # Built by hand - asdict() deep-copies every field on each broadcast
         return {
-            **asdict(self),
+            'agent_name': self.agent_name,
             'status': self.status.value,
+            'message': self.message,
+            'thinking_process': self.thinking_process,
+            'action_taken': self.action_taken,
+            'progress': self.progress,
             'timestamp': self.timestamp
         }
 
@@ -62,16 +95,51 @@ class IntelligentAgent:
         self.model_manager = model_manager
         
         self.conversation_history = []
-        self.error_memory = []  # Learn from past failures
+        self.error_memory = deque(maxlen=ERROR_MEMORY_SIZE)  # Learn from past failures
+        self.plan_cache = OrderedDict()  # (normalized task, context digest) -> plan
+        self._plan_cache_lock = threading.Lock()  # agents are shared across executor threads
     
-    def _get_thinking_model(self):
+    def _get_thinking_model(self, json_mode: bool = False, schema: Optional[Dict[str, Any]] = None):
         """Get current thinking model dynamically"""
-        return self.model_manager.get_thinking_model()
+        return self.model_manager.get_thinking_model(json_mode, schema)
     
-    def _get_execution_model(self):
+    def _get_execution_model(self, json_mode: bool = False, schema: Optional[Dict[str, Any]] = None):
         """Get current execution model dynamically"""
-        return self.model_manager.get_execution_model()
+        return self.model_manager.get_execution_model(json_mode, schema)
         
+    def _plan_cache_key(self, task: str, context: Optional[Dict[str, Any]] = None):
+        """Cache key for a task - case and whitespace insensitive, plus a digest of
+        the context (email bodies, form fields etc. only live there)"""
+        digest = hashlib.sha1(
+            json.dumps(context or {}, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return (" ".join(task.lower().split()), digest)
+    
+    def _get_cached_plan(self, task: str, context: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Return a copy of the plan of an earlier successful identical task"""
+        key = self._plan_cache_key(task, context)
+        with self._plan_cache_lock:
+            plan = self.plan_cache.get(key)
+            if plan is None:
+                return None
+            self.plan_cache.move_to_end(key)
+        self._send_update(
+            AgentStatus.THINKING,
+            f"Reusing plan with {len(plan.get('steps', []))} steps from an identical task",
+            progress=20
+        )
+        return copy.deepcopy(plan)
+    
+    def _cache_plan(self, task: str, plan: Dict[str, Any], context: Optional[Dict[str, Any]] = None):
+        """Remember the plan of a successful run"""
+        key = self._plan_cache_key(task, context)
+        plan = copy.deepcopy(plan)
+        with self._plan_cache_lock:
+            self.plan_cache[key] = plan
+            self.plan_cache.move_to_end(key)
+            while len(self.plan_cache) > PLAN_CACHE_SIZE:
+                self.plan_cache.popitem(last=False)
+    
     def _send_update(self, status: AgentStatus, message: str, **kwargs):
         """Send real-time update to UI"""
         update = AgentUpdate(
@@ -101,11 +169,11 @@ class IntelligentAgent:
         # Build context-aware prompt
         context_str = ""
         if context:
-            context_str = f"\nContext: {json.dumps(context, indent=2)}"
+            context_str = f"\nContext: {dumps_context(context)}"
         
         error_context = ""
         if self.error_memory:
-            error_context = f"\nPrevious failures to avoid:\n{json.dumps(self.error_memory[-3:], indent=2)}"
+            error_context = f"\nPrevious failures to avoid:\n{json.dumps(list(self.error_memory)[-3:], indent=2)}"
         
         prompt = f"""You are {self.name}, an intelligent AI agent with these capabilities:
 {', '.join(self.capabilities)}
@@ -129,14 +197,13 @@ Think deeply about this task. Provide a detailed execution plan in JSON format:
 Be specific and actionable. Consider edge cases and error scenarios."""
 
         try:
-            response = self._get_thinking_model().generate_content(prompt)
+            response = self._get_thinking_model(json_mode=True).generate_content(prompt)
             thinking_text = response.text
             
             # Extract JSON from response (handle markdown code blocks)
-            if "```json" in thinking_text:
-                thinking_text = thinking_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in thinking_text:
-                thinking_text = thinking_text.split("```")[1].split("```")[0].strip()
+            fence = FENCE_RE.search(thinking_text)
+            if fence:
+                thinking_text = fence.group(1)
             
             plan = json.loads(thinking_text)
             
@@ -192,7 +259,7 @@ Be specific and actionable. Consider edge cases and error scenarios."""
         prompt = f"""An error occurred while executing this step:
 Step: {json.dumps(step, indent=2)}
 Error: {str(error)}
-Context: {json.dumps(context, indent=2)}
+Context: {dumps_context(context)}
 
 As an intelligent agent, analyze this error and provide:
 1. Root cause analysis
@@ -208,13 +275,12 @@ Respond in JSON:
 }}"""
 
         try:
-            response = self._get_execution_model().generate_content(prompt)
+            response = self._get_execution_model(json_mode=True).generate_content(prompt)
             recovery_text = response.text
             
-            if "```json" in recovery_text:
-                recovery_text = recovery_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in recovery_text:
-                recovery_text = recovery_text.split("```")[1].split("```")[0].strip()
+            fence = FENCE_RE.search(recovery_text)
+            if fence:
+                recovery_text = fence.group(1)
             
             recovery_plan = json.loads(recovery_text)
             
@@ -246,8 +312,10 @@ Respond in JSON:
         )
         
         try:
-            # Step 1: Think and plan
-            plan = self.think(task, context)
+            # Step 1: Think and plan (or reuse the plan of an identical task)
+            plan = self._get_cached_plan(task, context)
+            if plan is None:
+                plan = self.think(task, context)
             steps = plan.get('steps', [])
             total_steps = len(steps)
             
@@ -291,7 +359,9 @@ Respond in JSON:
                         except:
                             continue  # Try again
             
-            # Step 3: Success!
+            # Step 3: Success! (only reuse plans whose every step actually succeeded)
+            if results and all(isinstance(r, dict) and r.get('success', False) for r in results):
+                self._cache_plan(task, plan, context)
             self._send_update(
                 AgentStatus.SUCCESS,
                 f"Task completed successfully!",
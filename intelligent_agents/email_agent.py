@@ -8,12 +8,14 @@ import os
 import json
 import time
 import base64
+import threading
 from pathlib import Path
 from typing import Dict, Any, List, Optional
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from email.message import EmailMessage
+from email.policy import SMTP
+from email.utils import formatdate
 from datetime import datetime
-from .agent_core import IntelligentAgent, AgentStatus
+from .agent_core import IntelligentAgent, AgentStatus, FENCE_RE, dumps_context
 
 # Langchain imports (optional - for advanced features)
 try:
@@ -23,6 +25,16 @@ try:
 except ImportError:
     LANGCHAIN_AVAILABLE = False
 
+# Gmail API client (imported once, not on every init)
+try:
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+    GMAIL_API_AVAILABLE = True
+except ImportError:
+    GMAIL_API_AVAILABLE = False
+
 class EmailAgent(IntelligentAgent):
     """
     Intelligent email agent using Langchain + Gmail API
@@ -50,6 +62,9 @@ class EmailAgent(IntelligentAgent):
         self.gmail_service = None
         self.langchain_llm = None
         self.message_history = None
+        # Sends of the task currently running on this thread, so a self-heal
+        # retry of a step doesn't send the same email twice
+        self._run_local = threading.local()
         self._init_langchain() if LANGCHAIN_AVAILABLE else None
     
     def _init_langchain(self):
@@ -80,12 +95,10 @@ class EmailAgent(IntelligentAgent):
     def _init_gmail_api(self):
         """Initialize Gmail API with comprehensive scopes"""
         
+        if not GMAIL_API_AVAILABLE:
+            raise Exception("Install: pip install google-auth-oauthlib google-auth-httplib2 google-api-python-client")
+        
         try:
-            from google.auth.transport.requests import Request
-            from google.oauth2.credentials import Credentials
-            from google_auth_oauthlib.flow import InstalledAppFlow
-            from googleapiclient.discovery import build
-            
             # Comprehensive Gmail scopes
             SCOPES = [
                 'https://www.googleapis.com/auth/gmail.send',
@@ -115,15 +128,22 @@ class EmailAgent(IntelligentAgent):
                 # Save credentials for next use
                 token_path.write_text(creds.to_json())
             
-            self.gmail_service = build('gmail', 'v1', credentials=creds)
+            # Skip the discovery document file cache - it's a slow disk read
+            self.gmail_service = build('gmail', 'v1', credentials=creds, cache_discovery=False)
             self._send_update(AgentStatus.EXECUTING, "Gmail API initialized successfully")
             return True
             
-        except ImportError:
-            raise Exception("Install: pip install google-auth-oauthlib google-auth-httplib2 google-api-python-client")
         except Exception as e:
             raise Exception(f"Gmail API init failed: {str(e)}")
     
+    def run(self, task: str, context: Dict[str, Any] = None, max_retries: int = 3) -> Dict[str, Any]:
+        """IntelligentAgent.run with send dedupe scoped to this one task"""
+        self._run_local.sends = {}  # (to, cc, bcc, subject, body) -> (sent_at, result)
+        try:
+            return super().run(task, context, max_retries)
+        finally:
+            self._run_local.sends = None
+    
     def execute_step(self, step: Dict[str, Any], context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Execute an email operation step using AI + Gmail API"""
         
@@ -157,7 +177,7 @@ class EmailAgent(IntelligentAgent):
         """Use AI to decide which email operation"""
         
         prompt = f"""Given this email task: "{action}"
-Context: {json.dumps(context, indent=2)}
+Context: {dumps_context(context)}
 
 Which operation? Choose from:
 - send_email: Send a new email
@@ -182,7 +202,7 @@ Respond with just the operation name."""
         
         # Use AI to extract email details and compose content
         prompt = f"""Task: {action}
-Context: {json.dumps(context, indent=2)}
+Context: {dumps_context(context)}
 
 Compose a professional email. Provide JSON:
 {{
@@ -199,13 +219,12 @@ Extract all email addresses from the task.
 Make the body well-formatted and professional."""
 
         try:
-            response = self._get_thinking_model().generate_content(prompt)
+            response = self._get_thinking_model(json_mode=True).generate_content(prompt)
             email_text = response.text.strip()
             
-            if "```json" in email_text:
-                email_text = email_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in email_text:
-                email_text = email_text.split("```")[1].split("```")[0].strip()
+            fence = FENCE_RE.search(email_text)
+            if fence:
+                email_text = fence.group(1)
             
             email_data = json.loads(email_text)
             
@@ -232,20 +251,29 @@ Make the body well-formatted and professional."""
     def _send_email_api(self, to: List[str], subject: str, body: str, cc: List[str] = None, bcc: List[str] = None) -> Dict[str, Any]:
         """Actually send the email via Gmail API with HTML support"""
         
+        # All recipients go in one message - never one API call per address.
+        # A retry (self-heal) within the same task of an already-sent email is
+        # answered with the earlier result; a new task always sends.
+        sends = getattr(self._run_local, 'sends', None)
+        send_key = (tuple(to), tuple(cc or ()), tuple(bcc or ()), subject, body)
+        cached = sends.get(send_key) if sends is not None else None
+        if cached:
+            notice = f"Identical email already sent {time.time() - cached[0]:.0f}s ago in this task - not resent"
+            self._send_update(AgentStatus.SUCCESS, notice)
+            return {**cached[1], "deduplicated": True, "message": notice}
+        
         try:
-            message = MIMEMultipart('alternative')
+            message = EmailMessage(policy=SMTP)
             message['To'] = ', '.join(to)
             if cc:
                 message['Cc'] = ', '.join(cc)
             if bcc:
                 message['Bcc'] = ', '.join(bcc)
             message['Subject'] = subject
-            message['Date'] = datetime.now().strftime('%a, %d %b %Y %H:%M:%S %z')
-            
-            # Attach both plain text and HTML versions
-            message.attach(MIMEText(body, 'plain'))
+            message['Date'] = formatdate(localtime=True)
+            message.set_content(body)
             
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
+            raw_message = base64.urlsafe_b64encode(bytes(message)).decode('utf-8')
             
             send_message = self.gmail_service.users().messages().send(
                 userId='me',
@@ -258,7 +286,7 @@ Make the body well-formatted and professional."""
                 f"✅ Email sent successfully to {len(to)} recipient(s)"
             )
             
-            return {
+            result = {
                 "success": True,
                 "operation": "send_email",
                 "to": to,
@@ -269,10 +297,52 @@ Make the body well-formatted and professional."""
                 "timestamp": datetime.now().isoformat()
             }
             
+            if sends is not None:
+                sends[send_key] = (time.time(), result)
+            
+            return result
+            
         except Exception as e:
             self._send_update(AgentStatus.ERROR, f"Email send failed: {str(e)}")
             raise Exception(f"Email send failed: {str(e)}")
     
+    def _fetch_summaries(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fetch From/Subject/Date/snippet for messages in one batched HTTP round-trip"""
+        
+        summaries = {}
+        
+        def _collect(request_id, response, exception):
+            if exception is not None:
+                return
+            headers_dict = {h['name']: h['value'] for h in response.get('payload', {}).get('headers', [])}
+            summaries[request_id] = {
+                "id": response.get('id', request_id),
+                "from": headers_dict.get('From', 'Unknown'),
+                "subject": headers_dict.get('Subject', '(No Subject)'),
+                "date": headers_dict.get('Date', 'Unknown'),
+                "snippet": response.get('snippet', '')
+            }
+        
+        if not messages:
+            return []
+        
+        batch = self.gmail_service.new_batch_http_request(callback=_collect)
+        for msg in messages:
+            # Metadata format skips downloading bodies we never use
+            batch.add(
+                self.gmail_service.users().messages().get(
+                    userId='me',
+                    id=msg['id'],
+                    format='metadata',
+                    metadataHeaders=['From', 'Subject', 'Date']
+                ),
+                request_id=msg['id']
+            )
+        batch.execute()
+        
+        # Preserve list order (newest first)
+        return [summaries[msg['id']] for msg in messages if msg['id'] in summaries]
+    
     def _read_email(self, action: str, context: Dict[str, Any], max_results: int = 10) -> Dict[str, Any]:
         """Read emails from Gmail with full content"""
         
@@ -286,28 +356,8 @@ Make the body well-formatted and professional."""
             
             messages = results.get('messages', [])
             
-            # Fetch full message details
-            email_list = []
-            for msg in messages[:5]:  # Limit to 5 for performance
-                try:
-                    full_msg = self.gmail_service.users().messages().get(
-                        userId='me',
-                        id=msg['id'],
-                        format='full'
-                    ).execute()
-                    
-                    headers = full_msg['payload'].get('headers', [])
-                    headers_dict = {h['name']: h['value'] for h in headers}
-                    
-                    email_list.append({
-                        "id": msg['id'],
-                        "from": headers_dict.get('From', 'Unknown'),
-                        "subject": headers_dict.get('Subject', '(No Subject)'),
-                        "date": headers_dict.get('Date', 'Unknown'),
-                        "snippet": full_msg.get('snippet', '')
-                    })
-                except:
-                    pass
+            # Fetch message details
+            email_list = self._fetch_summaries(messages[:5])  # Limit to 5 for performance
             
             self._send_update(
                 AgentStatus.SUCCESS,
@@ -356,27 +406,7 @@ Respond with just the search query, no explanation."""
             messages = results.get('messages', [])
             
             # Fetch details for found emails
-            email_list = []
-            for msg in messages[:10]:
-                try:
-                    full_msg = self.gmail_service.users().messages().get(
-                        userId='me',
-                        id=msg['id'],
-                        format='full'
-                    ).execute()
-                    
-                    headers = full_msg['payload'].get('headers', [])
-                    headers_dict = {h['name']: h['value'] for h in headers}
-                    
-                    email_list.append({
-                        "id": msg['id'],
-                        "from": headers_dict.get('From', 'Unknown'),
-                        "subject": headers_dict.get('Subject', '(No Subject)'),
-                        "date": headers_dict.get('Date', 'Unknown'),
-                        "snippet": full_msg.get('snippet', '')
-                    })
-                except:
-                    pass
+            email_list = self._fetch_summaries(messages[:10])
             
             self._send_update(
                 AgentStatus.SUCCESS,
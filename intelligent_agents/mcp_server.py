@@ -35,7 +35,7 @@ from intelligent_agents.model_manager import model_manager
 from intelligent_agents.output_formatter import output_formatter
 
 
-@dataclass
+@dataclass(slots=True)
 class MCPToolResult:
     """Standardized result from MCP tool execution"""
     success: bool
@@ -59,15 +59,43 @@ class SIGMAMCPServer:
     """
     
     def __init__(self):
-        """Initialize MCP server with all agents"""
-        self.agents = {
-            'system': SystemAgent(),
-            'email': EmailAgent(),
-            'web': WebAgent()
+        """Initialize MCP server - agents are created on first use"""
+        self._agent_classes = {
+            'system': SystemAgent,
+            'email': EmailAgent,
+            'web': WebAgent
         }
+        self.agents = {}
         
         self.tools = self._register_tools()
-        logger.info("✅ SIGMA MCP Server initialized with 3 agents and 15+ tools")
+        
+        # Tool name -> handler coroutine
+        self._handlers = {
+            'execute_command': self._execute_command,
+            'read_file': self._read_file,
+            'write_file': self._write_file,
+            'list_files': self._list_files,
+            'get_system_info': self._get_system_info,
+            'take_screenshot': self._take_screenshot,
+            'list_processes': self._list_processes,
+            'get_disk_usage': self._get_disk_usage,
+            'send_email': self._send_email,
+            'read_emails': self._read_emails,
+            'search_emails': self._search_emails,
+            'browse_web': self._browse_web,
+            'fill_form': self._fill_form,
+            'scrape_data': self._scrape_data,
+            'analyze_output': self._analyze_output,
+            'get_models': self._get_models
+        }
+        logger.info("✅ SIGMA MCP Server initialized with 15+ tools (agents load on first use)")
+    
+    def _get_agent(self, name: str):
+        """Return the named agent, constructing it the first time a tool needs it"""
+        agent = self.agents.get(name)
+        if agent is None and name in self._agent_classes:
+            agent = self.agents[name] = self._agent_classes[name]()
+        return agent
     
     def _register_tools(self) -> Dict[str, Dict[str, Any]]:
         """Register all available MCP tools"""
@@ -216,18 +244,17 @@ class SIGMAMCPServer:
         Call an MCP tool and return standardized result
         """
         try:
-            if tool_name not in self.tools:
+            tool_config = self.tools.get(tool_name)
+            if tool_config is None:
                 return MCPToolResult(
                     success=False,
                     data=None,
                     error=f"Unknown tool: {tool_name}"
                 )
             
-            tool_config = self.tools[tool_name]
+            # Only check the agent exists - handlers construct it if they need it
             agent_name = tool_config['agent']
-            agent = self.agents.get(agent_name)
-            
-            if not agent:
+            if agent_name not in self._agent_classes:
                 return MCPToolResult(
                     success=False,
                     data=None,
@@ -237,44 +264,14 @@ class SIGMAMCPServer:
             logger.info(f"📋 Calling tool: {tool_name}")
             
             # Route to appropriate handler
-            if tool_name == 'execute_command':
-                return await self._execute_command(params)
-            elif tool_name == 'read_file':
-                return await self._read_file(params)
-            elif tool_name == 'write_file':
-                return await self._write_file(params)
-            elif tool_name == 'list_files':
-                return await self._list_files(params)
-            elif tool_name == 'get_system_info':
-                return await self._get_system_info(params)
-            elif tool_name == 'take_screenshot':
-                return await self._take_screenshot(params)
-            elif tool_name == 'list_processes':
-                return await self._list_processes(params)
-            elif tool_name == 'get_disk_usage':
-                return await self._get_disk_usage(params)
-            elif tool_name == 'send_email':
-                return await self._send_email(params)
-            elif tool_name == 'read_emails':
-                return await self._read_emails(params)
-            elif tool_name == 'search_emails':
-                return await self._search_emails(params)
-            elif tool_name == 'browse_web':
-                return await self._browse_web(params)
-            elif tool_name == 'fill_form':
-                return await self._fill_form(params)
-            elif tool_name == 'scrape_data':
-                return await self._scrape_data(params)
-            elif tool_name == 'analyze_output':
-                return await self._analyze_output(params)
-            elif tool_name == 'get_models':
-                return await self._get_models(params)
-            else:
+            handler = self._handlers.get(tool_name)
+            if handler is None:
                 return MCPToolResult(
                     success=False,
                     data=None,
                     error=f"Tool handler not implemented: {tool_name}"
                 )
+            return await handler(params)
         
         except Exception as e:
             logger.error(f"❌ Tool execution error: {str(e)}")
@@ -295,7 +292,7 @@ class SIGMAMCPServer:
             if not command:
                 return MCPToolResult(success=False, data=None, error="command parameter required")
             
-            result = self.agents['system'].run(
+            result = self._get_agent('system').run(
                 task=f"Execute: {command}",
                 context={'command': command, 'timeout': timeout}
             )
@@ -419,7 +416,7 @@ class SIGMAMCPServer:
         try:
             region = params.get('region', 'full')
             
-            result = self.agents['system'].run(
+            result = self._get_agent('system').run(
                 task="Take screenshot of entire screen",
                 context={'action': 'screenshot', 'region': region}
             )
@@ -498,7 +495,7 @@ class SIGMAMCPServer:
             if not (to and subject and body):
                 return MCPToolResult(success=False, data=None, error="to, subject, body parameters required")
             
-            result = self.agents['email'].run(
+            result = self._get_agent('email').run(
                 task=f"Send email to {to} with subject '{subject}'",
                 context={'to': to, 'subject': subject, 'body': body}
             )
@@ -517,7 +514,7 @@ class SIGMAMCPServer:
             query = params.get('query', 'is:unread')
             limit = params.get('limit', 10)
             
-            result = self.agents['email'].run(
+            result = self._get_agent('email').run(
                 task=f"Read {limit} emails with query: {query}",
                 context={'query': query, 'limit': limit, 'action': 'read'}
             )
@@ -539,7 +536,7 @@ class SIGMAMCPServer:
             if not query:
                 return MCPToolResult(success=False, data=None, error="query parameter required")
             
-            result = self.agents['email'].run(
+            result = self._get_agent('email').run(
                 task=f"Search emails with query: {query}",
                 context={'query': query, 'limit': limit, 'action': 'search'}
             )
@@ -563,7 +560,7 @@ class SIGMAMCPServer:
             if not url:
                 return MCPToolResult(success=False, data=None, error="url parameter required")
             
-            result = self.agents['web'].run(
+            result = self._get_agent('web').run(
                 task=f"Browse {url} and {action}",
                 context={'url': url, 'action': action}
             )
@@ -586,7 +583,7 @@ class SIGMAMCPServer:
             if not url:
                 return MCPToolResult(success=False, data=None, error="url parameter required")
             
-            result = self.agents['web'].run(
+            result = self._get_agent('web').run(
                 task=f"Fill form on {url} and submit={submit}",
                 context={'url': url, 'fields': fields, 'submit': submit, 'action': 'fill_form'}
             )
@@ -608,7 +605,7 @@ class SIGMAMCPServer:
             if not url:
                 return MCPToolResult(success=False, data=None, error="url parameter required")
             
-            result = self.agents['web'].run(
+            result = self._get_agent('web').run(
                 task=f"Scrape data from {url}",
                 context={'url': url, 'selectors': selectors, 'action': 'scrape'}
             )
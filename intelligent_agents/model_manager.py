@@ -6,7 +6,7 @@ Supports multiple AI providers with hot-swapping
 
 import os
 from typing import Dict, Any, List, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from enum import Enum
 import json
 
@@ -56,7 +56,18 @@ class AIModel:
     available: bool = True
     
     def to_dict(self):
-        return asdict(self)
+        return {
+            'id': self.id,
+            'name': self.name,
+            'provider': self.provider,
+            'model_name': self.model_name,
+            'description': self.description,
+            'capabilities': list(self.capabilities),
+            'cost_per_1m': self.cost_per_1m,
+            'rate_limit': self.rate_limit,
+            'api_key_env': self.api_key_env,
+            'available': self.available
+        }
 
 class ModelManager:
     """Manages multiple AI models with automatic failover"""
@@ -65,6 +76,9 @@ class ModelManager:
         self.current_thinking_model = None
         self.current_execution_model = None
         self.usage_count = {}
+        self._clients = {}  # (model_id, json_mode, schema) -> client, reused across calls
+        self._sdk_clients = {}  # (provider, api key) -> SDK client, shares one connection pool
+        self._http_session = None  # keep-alive session for Ollama's HTTP API
         
         # Define available models
         self.available_models = {
@@ -254,16 +268,47 @@ class ModelManager:
             return True
         return False
     
-    def get_thinking_model(self):
+    def get_thinking_model(self, json_mode: bool = False, schema: Optional[Dict[str, Any]] = None):
         """Get configured thinking model client"""
-        return self._get_model_client(self.current_thinking_model)
+        return self._get_model_client(self.current_thinking_model, json_mode, schema)
     
-    def get_execution_model(self):
+    def get_execution_model(self, json_mode: bool = False, schema: Optional[Dict[str, Any]] = None):
         """Get configured execution model client"""
-        return self._get_model_client(self.current_execution_model)
+        return self._get_model_client(self.current_execution_model, json_mode, schema)
+    
+    def _get_model_client(self, model_id: str, json_mode: bool = False, schema: Optional[Dict[str, Any]] = None):
+        """Get a cached client for the model
+        
+        Clients hold the provider's HTTP connection pool, so building one per
+        call paid a fresh TLS handshake on every request. Switching models
+        still takes effect immediately since the cache is keyed on model_id.
+        """
+        if schema is not None:
+            json_mode = True
+        key = (model_id, json_mode, json.dumps(schema, sort_keys=True) if schema else None)
+        client = self._clients.get(key)
+        if client is None:
+            client = self._create_model_client(model_id, json_mode, schema)
+            self._clients[key] = client
+        return client
     
-    def _get_model_client(self, model_id: str):
-        """Get actual AI model client"""
+    def _get_sdk_client(self, model: AIModel, factory):
+        """One SDK client per provider and key, so every model variant reuses its connections"""
+        key = (model.provider, os.getenv(model.api_key_env))
+        client = self._sdk_clients.get(key)
+        if client is None:
+            client = self._sdk_clients[key] = factory()
+        return client
+    
+    def _create_model_client(self, model_id: str, json_mode: bool = False, schema: Optional[Dict[str, Any]] = None):
+        """Create actual AI model client
+        
+        json_mode asks the provider for bare JSON output (no markdown fences)
+        where supported, so callers can json.loads the text directly.
+        schema (a JSON Schema object) additionally constrains the output shape
+        on Gemini; the OpenAI-compatible providers get plain JSON mode
+        (gpt-4-turbo rejects json_schema response formats).
+        """
         if not model_id or model_id not in self.available_models:
             raise Exception(f"Model {model_id} not available")
         
@@ -273,28 +318,34 @@ class ModelManager:
             if not genai:
                 raise Exception("google-generativeai not installed")
             genai.configure(api_key=os.getenv(model.api_key_env))
+            generation_config = {
+                "temperature": 1.0 if "thinking" in model_id else 0.7,
+                "top_p": 0.95,
+                "max_output_tokens": 8192,
+            }
+            if json_mode:
+                generation_config["response_mime_type"] = "application/json"
+            if schema:
+                generation_config["response_schema"] = schema
             return genai.GenerativeModel(
                 model.model_name,
-                generation_config={
-                    "temperature": 1.0 if "thinking" in model_id else 0.7,
-                    "top_p": 0.95,
-                    "max_output_tokens": 8192,
-                }
+                generation_config=generation_config
             )
         
         elif model.provider == "openai":
             if not OpenAI:
                 raise Exception("openai not installed")
             return OpenAIWrapper(
-                client=OpenAI(api_key=os.getenv(model.api_key_env)),
-                model_name=model.model_name
+                client=self._get_sdk_client(model, lambda: OpenAI(api_key=os.getenv(model.api_key_env))),
+                model_name=model.model_name,
+                json_mode=json_mode
             )
         
         elif model.provider == "anthropic":
             if not Anthropic:
                 raise Exception("anthropic not installed")
             return AnthropicWrapper(
-                client=Anthropic(api_key=os.getenv(model.api_key_env)),
+                client=self._get_sdk_client(model, lambda: Anthropic(api_key=os.getenv(model.api_key_env))),
                 model_name=model.model_name
             )
         
@@ -302,17 +353,20 @@ class ModelManager:
             if not OpenAI:
                 raise Exception("openai not installed (needed for Groq)")
             return OpenAIWrapper(
-                client=OpenAI(
+                client=self._get_sdk_client(model, lambda: OpenAI(
                     api_key=os.getenv(model.api_key_env),
                     base_url="https://api.groq.com/openai/v1"
-                ),
-                model_name=model.model_name
+                )),
+                model_name=model.model_name,
+                json_mode=json_mode
             )
         
         elif model.provider == "ollama":
             if not requests:
                 raise Exception("requests not installed")
-            return OllamaWrapper(model_name=model.model_name)
+            if self._http_session is None:
+                self._http_session = requests.Session()
+            return OllamaWrapper(model_name=model.model_name, json_mode=json_mode, session=self._http_session)
         
         raise Exception(f"Unknown provider: {model.provider}")
     
@@ -322,14 +376,19 @@ class ModelManager:
 
 # Wrapper classes to provide unified interface
 class OpenAIWrapper:
-    def __init__(self, client, model_name):
+    def __init__(self, client, model_name, json_mode=False):
         self.client = client
         self.model_name = model_name
+        self.json_mode = json_mode
     
     def generate_content(self, prompt):
+        kwargs = {}
+        if self.json_mode:
+            kwargs["response_format"] = {"type": "json_object"}
         response = self.client.chat.completions.create(
             model=self.model_name,
-            messages=[{"role": "user", "content": prompt}]
+            messages=[{"role": "user", "content": prompt}],
+            **kwargs
         )
         return TextResponse(response.choices[0].message.content)
 
@@ -347,13 +406,15 @@ class AnthropicWrapper:
         return TextResponse(response.content[0].text)
 
 class OllamaWrapper:
-    def __init__(self, model_name):
+    def __init__(self, model_name, json_mode=False, session=None):
         self.model_name = model_name
         self.base_url = "http://localhost:11434"
+        self.json_mode = json_mode
+        self.session = session or requests
 
     def _choose_fallback_model(self) -> Optional[str]:
         try:
-            resp = requests.get(f"{self.base_url}/api/tags", timeout=3)
+            resp = self.session.get(f"{self.base_url}/api/tags", timeout=3)
             if resp.status_code != 200:
                 return None
             data = resp.json() if resp.text else {}
@@ -369,7 +430,9 @@ class OllamaWrapper:
     
     def generate_content(self, prompt):
         payload = {"model": self.model_name, "prompt": prompt, "stream": False}
-        response = requests.post(
+        if self.json_mode:
+            payload["format"] = "json"
+        response = self.session.post(
             f"{self.base_url}/api/generate",
             json=payload,
             timeout=90
@@ -379,8 +442,8 @@ class OllamaWrapper:
         if response.status_code != 200 or "response" not in data:
             fallback = self._choose_fallback_model()
             if fallback and fallback != self.model_name:
-                retry_payload = {"model": fallback, "prompt": prompt, "stream": False}
-                retry = requests.post(
+                retry_payload = {**payload, "model": fallback}
+                retry = self.session.post(
                     f"{self.base_url}/api/generate",
                     json=retry_payload,
                     timeout=90
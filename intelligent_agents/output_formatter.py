@@ -6,7 +6,7 @@ Transforms raw command output into beautiful, structured, AI-powered responses
 
 import json
 import re
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -23,6 +23,19 @@ class OutputType(Enum):
     TABLE_DATA = "table_data"
     JSON_DATA = "json_data"
 
+# Output type detection patterns - compiled once instead of per keyword per call
+def _command_words(*keywords: str) -> re.Pattern:
+    return re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + r")\b")
+
+FILE_LISTING_CMD_RE = _command_words('ls', 'list', 'dir', 'files')
+SYSTEM_INFO_CMD_RE = _command_words('systemctl', 'uname', 'lsb', 'hostnamectl', 'system', 'info')
+PROCESS_CMD_RE = _command_words('ps', 'top', 'process', 'pgrep', 'pstree')
+DISK_CMD_RE = _command_words('df', 'disk', 'du', 'usage', 'storage')
+NETWORK_CMD_RE = _command_words('ip', 'ifconfig', 'netstat', 'ping', 'network', 'connection')
+FILE_MODE_RE = re.compile(r"drwx|-rw|lrw")
+ERROR_OUTPUT_RE = re.compile(r"error|failed|exception|traceback|not found|permission denied")
+SUCCESS_OUTPUT_RE = re.compile(r"success|completed|done|ok|created|deleted")
+
 class OutputFormatter:
     """
     Intelligently formats raw command output into beautiful, structured responses
@@ -46,37 +59,34 @@ class OutputFormatter:
         """Intelligently detect what type of output this is"""
         output_lower = output.lower()
         command_lower = command.lower()
-
-        def has_command_keyword(keywords: List[str]) -> bool:
-            return any(re.search(rf"\b{re.escape(keyword)}\b", command_lower) for keyword in keywords)
         
         # File listing detection
-        if has_command_keyword(['ls', 'list', 'dir', 'files']):
-            if 'total' in output_lower or (any(x in output for x in ['drwx', '-rw', 'lrw'])):
+        if FILE_LISTING_CMD_RE.search(command_lower):
+            if 'total' in output_lower or FILE_MODE_RE.search(output):
                 return OutputType.FILE_LISTING
         
         # System info detection
-        if has_command_keyword(['systemctl', 'uname', 'lsb', 'hostnamectl', 'system', 'info']):
+        if SYSTEM_INFO_CMD_RE.search(command_lower):
             return OutputType.SYSTEM_INFO
         
         # Process list detection
-        if has_command_keyword(['ps', 'top', 'process', 'pgrep', 'pstree']):
+        if PROCESS_CMD_RE.search(command_lower):
             return OutputType.PROCESS_LIST
         
         # Disk usage detection
-        if has_command_keyword(['df', 'disk', 'du', 'usage', 'storage']):
+        if DISK_CMD_RE.search(command_lower):
             return OutputType.DISK_USAGE
         
         # Network info detection
-        if has_command_keyword(['ip', 'ifconfig', 'netstat', 'ping', 'network', 'connection']):
+        if NETWORK_CMD_RE.search(command_lower):
             return OutputType.NETWORK_INFO
         
         # Error detection
-        if any(keyword in output_lower for keyword in ['error', 'failed', 'exception', 'traceback', 'not found', 'permission denied']):
+        if ERROR_OUTPUT_RE.search(output_lower):
             return OutputType.ERROR_OUTPUT
         
         # Success detection
-        if any(keyword in output_lower for keyword in ['success', 'completed', 'done', 'ok', 'created', 'deleted']):
+        if SUCCESS_OUTPUT_RE.search(output_lower):
             return OutputType.SUCCESS_MESSAGE
         
         # JSON detection
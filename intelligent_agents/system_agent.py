@@ -16,15 +16,280 @@ import os
 import json
 import time
 import re
+import signal
 import subprocess
+import tempfile
 import shutil
 import platform
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 from pathlib import Path
+from collections import OrderedDict, deque
 from typing import Dict, Any, List, Optional
-from .agent_core import IntelligentAgent, AgentStatus
+from .agent_core import IntelligentAgent, AgentStatus, FENCE_RE, dumps_context
 from .output_formatter import format_output, OutputFormatter
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import mss
+    import mss.tools
+    MSS_AVAILABLE = True
+except ImportError:
+    MSS_AVAILABLE = False
+
+# Tool names the model may pick in _decide_tool; decisions are cached per prompt
+KNOWN_TOOLS = frozenset({'shell_command', 'file_operation', 'screenshot', 'process_management'})
+
+# Most recent _log_execution entries kept for debugging
+EXECUTION_LOG_SIZE = 1000
+
+# Entries kept in each model-answer cache (tool decisions, shell commands, file operations)
+TOOL_CACHE_SIZE = 256
+
+# Concurrent tool-decision calls when prefetching a plan's steps
+PREFETCH_WORKERS = 4
+
+# _decide_tool keyword shortcuts (plain substring matches, one regex scan per tool)
+SCREENSHOT_ACTION_RE = re.compile('screenshot|capture screen|screen grab|take picture of screen')
+FILE_ACTION_RE = re.compile('create file|create folder|make directory|mkdir|touch')
+SHELL_ACTION_RE = re.compile('list|ls|find|grep|check|show|ps|kill')
+
+# Common synonyms for tool names in AI-generated plans
+TOOL_SYNONYMS = {
+    'execute_shell_command': 'shell_command',
+    'execute_shell_commands': 'shell_command',
+    'shell': 'shell_command',
+    'shell_commands': 'shell_command',
+    'file_operations': 'file_operation',
+    'file': 'file_operation',
+    'files': 'file_operation',
+    'screenshot_capture': 'screenshot',
+    'capture_screenshot': 'screenshot',
+}
+
+# Structured output for _execute_file_operation (enforced by providers that support schemas)
+FILE_OPERATIONS = ('create', 'read', 'update', 'delete', 'copy', 'move', 'mkdir')
+FILE_OPERATION_SCHEMA = {
+    "title": "file_operation",
+    "type": "object",
+    "properties": {
+        "operation": {"type": "string", "enum": list(FILE_OPERATIONS)},
+        "path": {"type": "string"},
+        "content": {"type": "string"},
+        "destination": {"type": "string"}
+    },
+    "required": ["operation", "path"]
+}
+
+# _ai_execute routes unknown actions to one of the regular tools instead of running generated code
+AI_EXECUTE_SCHEMA = {
+    "title": "ai_execute",
+    "type": "object",
+    "properties": {
+        "tool": {"type": "string", "enum": ['shell_command', 'file_operation', 'screenshot']},
+        "action": {"type": "string"}
+    },
+    "required": ["tool", "action"]
+}
+
+# Screenshot CLI fallbacks, in order of preference (output path is appended)
+SCREENSHOT_COMMANDS = (
+    ('gnome-screenshot', ['gnome-screenshot', '-f']),
+    ('scrot', ['scrot']),
+    ('imagemagick', ['import', '-window', 'root']),
+)
+
+# Characters returned by a file 'read' operation (larger files are truncated)
+MAX_READ_CHARS = 256 * 1024
+
+# Bytes of stdout/stderr kept per shell command
+MAX_SHELL_OUTPUT = 1024 * 1024
+
+def _read_capped(spool) -> str:
+    """Read back at most MAX_SHELL_OUTPUT bytes of a spooled stream"""
+    size = spool.tell()
+    spool.seek(0)
+    text = spool.read(MAX_SHELL_OUTPUT).decode(errors="replace")
+    if size > MAX_SHELL_OUTPUT:
+        text += f"\n... [output truncated, {size - MAX_SHELL_OUTPUT} more bytes]"
+    return text
+
+def run_shell(command: str, timeout: float, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> subprocess.CompletedProcess:
+    """subprocess.run(shell=True) with output spooled to temp files instead of pipes
+    
+    capture_output keeps everything a command prints in memory; here only the
+    first MAX_SHELL_OUTPUT bytes of each stream are ever read back.
+    
+    The command gets its own process group so a timeout kills the whole
+    pipeline, not just the shell (its children would otherwise keep running).
+    """
+    posix = os.name == 'posix'
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(command, shell=True, stdout=out, stderr=err, cwd=cwd, env=env, start_new_session=posix)
+        try:
+            returncode = proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            if posix:
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            else:
+                proc.kill()
+            proc.wait()
+            raise
+        return subprocess.CompletedProcess(command, returncode, _read_capped(out), _read_capped(err))
+
+# Linux ioctl that clones a file's extents (copy-on-write) on btrfs, XFS, bcachefs...
+FICLONE = 0x40049409
+
+def clone_file(src, dst) -> bool:
+    """Copy-on-write clone of src to a new file dst with metadata like copy2; False if unsupported
+    
+    Only clones into a destination that doesn't exist yet (created with O_EXCL,
+    so symlinks and same-file targets are refused too). Existing files are left
+    to copy2, which writes them in place - keeping hard links, owner and ACLs,
+    and raising on read-only or same-file destinations.
+    """
+    if fcntl is None or not hasattr(fcntl, 'ioctl'):
+        return False
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    try:
+        fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    except OSError:
+        return False  # exists (or can't be created) - let copy2 handle it
+    try:
+        with os.fdopen(fd, 'wb') as fdst, open(src, 'rb') as fsrc:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copystat(src, dst)
+    except OSError:
+        os.unlink(dst)
+        return False
+    return True
+
+def copy_file(src, dst):
+    """shutil.copy2 that tries a reflink clone first (usable as copytree's copy_function)"""
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    if clone_file(src, dst):
+        return dst
+    return shutil.copy2(src, dst)
+
+class PromptFields(dict):
+    """format_map() mapping for prompt templates - missing context keys render as `default`"""
+    def __init__(self, context: Dict[str, Any], default: Any = None, **fields):
+        super().__init__(context, **fields)
+        self.default = default
+    
+    def __missing__(self, key):
+        return self.default
+
+# SystemAgent model prompts, filled from the step context with str.format_map
+DECIDE_TOOL_PROMPT = """Given this action: "{action}"
+Current Context:
+- Working Directory: {cwd}
+- OS: {os}
+- Desktop: {desktop}
+
+Which tool should be used? Choose from:
+- shell_command: Execute terminal/bash commands (ls, cd, grep, find, ps, etc.)
+- file_operation: Create, read, update, delete files and directories (PREFERRED for file/folder creation)
+- screenshot: Capture screen (for screenshot/screen capture tasks)
+- process_management: Kill/start processes
+
+CRITICAL RULES: 
+- For ANY screenshot/screen capture → MUST use "screenshot"
+- For "create file" or "create folder" → use file_operation
+- For "list", "show", "check", "find" → use shell_command
+
+Respond with just the tool name, nothing else."""
+
+SHELL_COMMAND_PROMPT = """Generate a safe bash command to accomplish: "{action}"
+
+Current System Context:
+- Working Directory: {cwd}
+- Home Directory: {home}
+- Desktop: {desktop}
+- OS: {os}
+- Shell: {shell}
+
+Important Rules:
+1. Generate ONLY the command, no explanation
+2. Use absolute paths when working with files
+3. DO NOT add || true or || echo to commands - let failures fail naturally
+4. For file creation, use touch or echo > file
+5. For directory creation, use mkdir -p
+6. Safe to execute (no rm -rf /, no dangerous operations)
+7. If action mentions "desktop", use: {desktop}
+8. If action mentions "home", use: {home}
+9. Return CLEAN commands only - no error suppression
+
+Examples:
+- "create a file test.txt on desktop" → touch {desktop}/test.txt
+- "list files" → ls -la {cwd}
+- "check disk space" → df -h
+- "show current directory" → pwd
+
+Command:"""
+
+FILE_OPERATION_PROMPT = """Analyze this file operation request: "{action}"
+
+Current System Context:
+- Working Directory: {cwd}
+- Home Directory: {home}
+- Desktop: {desktop}
+- Documents: {documents}
+- Downloads: {downloads}
+
+Provide a JSON response for the file operation:
+{{
+    "operation": "create|read|update|delete|copy|move|mkdir",
+    "path": "/absolute/path/to/file or directory",
+    "content": "content if creating/updating file",
+    "destination": "destination path if copying/moving"
+}}
+
+Path Resolution Rules:
+- If action says "desktop" or "on desktop": use {desktop}/filename
+- If action says "documents": use {documents}/filename  
+- If action says "home": use {home}/filename
+- If relative path given: use {cwd}/filename
+- Always use absolute paths
+
+Examples:
+- "create a file test.txt on desktop" → {{"operation": "create", "path": "{desktop}/test.txt", "content": ""}}
+- "create folder MyFolder on desktop" → {{"operation": "mkdir", "path": "{desktop}/MyFolder"}}
+- "read file data.json" → {{"operation": "read", "path": "{cwd}/data.json"}}
+
+JSON Response:"""
+
+AI_EXECUTE_PROMPT = """You need to accomplish this task: "{action}"
+
+Current System Context:
+- Working Directory: {cwd}
+- Home Directory: {home}
+- Desktop: {desktop}
+- OS: {os}
+
+Choose ONE tool and restate the task as a concrete instruction for it:
+- shell_command: run a terminal command (processes, system info, searching, anything a shell can do)
+- file_operation: create, read, update, delete, copy or move files and directories
+- screenshot: capture the screen
+
+Use absolute paths from the context above.
+
+Respond in JSON:
+{{"tool": "shell_command|file_operation|screenshot", "action": "specific instruction for that tool"}}
+
+Example for "create file test.txt on desktop":
+{{"tool": "file_operation", "action": "create an empty file {desktop}/test.txt"}}"""
+
 class ContextAwareEngine:
     """
     Advanced Context-Aware Engine that automatically detects and tracks:
@@ -65,12 +330,12 @@ class ContextAwareEngine:
         # User information
         self._detect_user_info()
         
-        # Environment variables
-        self.env_vars = dict(os.environ)
-        
         # Permissions
         self._detect_permissions()
         
+        # get_context() snapshot, rebuilt after set_cwd
+        self._context = None
+        
     def _detect_special_folders(self):
         """Detect common special folders across platforms"""
         if self.os_type == "Windows":
@@ -224,8 +489,22 @@ class ContextAwareEngine:
         # If relative, join with cwd
         return os.path.join(self.cwd, expanded)
     
+    @property
+    def env_vars(self):
+        """Live process environment (no startup snapshot to go stale)"""
+        return os.environ
+    
     def get_context(self) -> Dict[str, Any]:
-        """Get comprehensive context information for AI agents"""
+        """Get comprehensive context information for AI agents
+        
+        Everything but cwd is detected once at startup, so the dict is built on
+        first use and shared (read-only) until the working directory changes.
+        """
+        if self._context is None:
+            self._context = MappingProxyType(self._build_context())
+        return self._context
+    
+    def _build_context(self) -> Dict[str, Any]:
         return {
             # Paths
             "cwd": self.cwd,
@@ -291,6 +570,7 @@ class ContextAwareEngine:
         if os.path.isdir(new_cwd):
             self.cwd = new_cwd
             os.chdir(new_cwd)
+            self._context = None
             return True
         return False
 
@@ -325,7 +605,24 @@ class SystemAgent(IntelligentAgent):
         self.context_engine = ContextAwareEngine()
         
         # Execution log for debugging
-        self.execution_log = []
+        self.execution_log = deque(maxlen=EXECUTION_LOG_SIZE)
+        
+        # Model answers reused for identical prompts (LRU, TOOL_CACHE_SIZE entries each)
+        self._tool_cache = OrderedDict()  # (action, cwd, os, desktop) -> tool
+        self._command_cache = OrderedDict()  # (action, context paths, os, shell) -> shell command
+        self._file_op_cache = OrderedDict()  # (action, context paths) -> file operation JSON
+        self._cache_lock = threading.Lock()  # plan prefetch fills the caches from worker threads
+        
+        # tool -> handler(action, context); anything else goes to _ai_execute
+        self._tool_handlers = {
+            'shell_command': self._execute_shell_command,
+            'file_operation': self._execute_file_operation,
+            'screenshot': self._take_screenshot,
+        }
+        
+        # mss grabbers hold display handles that are only valid on their own thread
+        self._screen_local = threading.local()
+        self._screenshot_commands = None  # installed SCREENSHOT_COMMANDS, probed until one is found
         
         # Quick access to common paths
         self.home = self.context_engine.home
@@ -701,14 +998,7 @@ class SystemAgent(IntelligentAgent):
             print(f"   Task: {original_task}", flush=True)
             print(f"   Command: $ {command}", flush=True)
             
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=30,
-                cwd=self.cwd
-            )
+            result = run_shell(command, timeout=30, cwd=self.cwd)
             
             output = result.stdout.strip() if result.returncode == 0 else result.stderr.strip()
             success = result.returncode == 0
@@ -760,24 +1050,11 @@ class SystemAgent(IntelligentAgent):
             
             self._send_update(AgentStatus.EXECUTING, "📸 Capturing screenshot...")
             
-            screenshot_taken = False
-            error_msg = ""
-            
-            # Try multiple screenshot methods
-            methods = [
-                (['gnome-screenshot', '-f', str(filepath)], 'gnome-screenshot'),
-                (['scrot', str(filepath)], 'scrot'),
-                (['import', '-window', 'root', str(filepath)], 'imagemagick'),
-            ]
-            
-            for cmd, method_name in methods:
-                try:
-                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
-                    if result.returncode == 0 and filepath.exists():
-                        screenshot_taken = True
-                        break
-                except (FileNotFoundError, Exception) as e:
-                    error_msg += f" | {method_name}: {str(e)}"
+            # mss first, then external tools
+            screenshot_taken, error_msg = self._grab_screen(filepath)
+            if not screenshot_taken:
+                screenshot_taken, cli_error = self._capture_with_cli(filepath)
+                error_msg += cli_error
             
             if not screenshot_taken:
                 raise Exception(f"Screenshot failed. Install: gnome-screenshot, scrot, or imagemagick")
@@ -1483,17 +1760,25 @@ Requirements:
         try:
             full_context = {**self.context_engine.get_context(), **(context or {})}
             
-            # Think about the task
-            plan = self.think(task, full_context)
+            # Think about the task (or reuse the plan of an identical task)
+            plan = self._get_cached_plan(task, context)
+            if plan is None:
+                plan = self.think(task, full_context)
             
             # Execute steps
+            steps = plan.get('steps', [])
+            self._prefetch_tool_decisions(steps, full_context)
             results = []
-            for step in plan.get('steps', []):
+            for step in steps:
                 result = self.execute_step(step, full_context)
                 results.append(result)
             
+            success = all(r.get('success', False) for r in results)
+            if success and results:
+                self._cache_plan(task, plan, context)
+            
             return {
-                "success": all(r.get('success', False) for r in results),
+                "success": success,
                 "results": results,
                 "task": task,
                 "plan": plan
@@ -1501,13 +1786,87 @@ Requirements:
         except Exception as e:
             return {"success": False, "error": str(e), "results": []}
     
+    def _grab_screen(self, filepath: Path):
+        """Capture the primary monitor to a PNG with mss - returns (taken, error)"""
+        if not MSS_AVAILABLE:
+            return False, "mss not installed"
+        try:
+            sct = getattr(self._screen_local, 'sct', None)
+            if sct is None:
+                sct = self._screen_local.sct = mss.mss()
+            shot = sct.grab(sct.monitors[1])
+            mss.tools.to_png(shot.rgb, shot.size, output=str(filepath))
+            return filepath.exists(), ""
+        except Exception as e:
+            return False, f"mss failed: {str(e)}"
+    
+    def _prefetch_tool_decisions(self, steps: List[Dict[str, Any]], context: Dict[str, Any]):
+        """Decide the tools of a plan's 'auto' steps concurrently
+        
+        Each decision may be a model round-trip; running them up front in
+        parallel fills _tool_cache, so execute_step's own _decide_tool calls
+        become cache hits instead of serial network calls.
+        """
+        # Only actions that would reach the model - keyword matches are already free
+        actions = [
+            str(step.get('action', '')) for step in steps
+            if step.get('tool', 'auto') == 'auto'
+            and str(step.get('action', '')).strip().lower() not in ('create_file', 'write_file')
+            and self._keyword_tool(str(step.get('action', '')).lower()) is None
+        ]
+        if len(actions) < 2:
+            return
+        step_context = {**self.context_engine.get_context(), **context}
+        with ThreadPoolExecutor(max_workers=min(PREFETCH_WORKERS, len(actions))) as pool:
+            list(pool.map(lambda action: self._decide_tool(action, step_context), actions))
+    
+    def _cache_get(self, cache: OrderedDict, key):
+        with self._cache_lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+    
+    def _cache_put(self, cache: OrderedDict, key, value):
+        with self._cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            if len(cache) > TOOL_CACHE_SIZE:
+                cache.popitem(last=False)
+    
+    def _cache_discard(self, cache: OrderedDict, key):
+        with self._cache_lock:
+            cache.pop(key, None)
+    
+    def _capture_with_cli(self, filepath: Path):
+        """Capture with the first installed screenshot tool that succeeds - returns (taken, error)"""
+        if not self._screenshot_commands:
+            # Only a non-empty probe is kept, so a tool installed after startup is picked up
+            self._screenshot_commands = [(name, argv) for name, argv in SCREENSHOT_COMMANDS if shutil.which(argv[0])] or None
+        if not self._screenshot_commands:
+            return False, " | no screenshot tool installed"
+        error_msg = ""
+        for name, argv in self._screenshot_commands:
+            try:
+                result = subprocess.run([*argv, str(filepath)], capture_output=True, text=True, timeout=5)
+                if result.returncode == 0 and filepath.exists():
+                    return True, error_msg
+                error_msg += f" | {name} failed: {result.stderr}"
+            except Exception as e:
+                error_msg += f" | {name} error: {str(e)}"
+        return False, error_msg
+    
+    def _plan_cache_key(self, task: str, context: Optional[Dict[str, Any]] = None):
+        """Plans embed paths, so only reuse them from the same working directory"""
+        return (self.context_engine.cwd, super()._plan_cache_key(task, context))
+    
     def _log_execution(self, action: str, details: Dict[str, Any]):
         """Log execution for debugging"""
         log_entry = {
             "timestamp": time.time(),
             "action": action,
             "details": details,
-            "context": self.context_engine.get_context()
+            "cwd": self.context_engine.cwd
         }
         self.execution_log.append(log_entry)
         print(f"[SYSTEM AGENT] {action}: {json.dumps(details, indent=2)}")
@@ -1523,7 +1882,7 @@ Requirements:
         # Build context-aware prompt with tool guidance
         context_str = ""
         if context:
-            context_str = f"\nContext: {json.dumps(context, indent=2)}"
+            context_str = f"\nContext: {dumps_context(context)}"
         
         sys_context = self.context_engine.get_context()
         
@@ -1577,14 +1936,13 @@ Provide execution plan in JSON:
 CRITICAL: For "{task}" - if it's about LISTING/SHOWING/DISPLAYING → MUST use shell_command, NOT file_operation!"""
 
         try:
-            response = self._get_thinking_model().generate_content(prompt)
+            response = self._get_thinking_model(json_mode=True).generate_content(prompt)
             thinking_text = response.text
             
             # Extract JSON from response
-            if "```json" in thinking_text:
-                thinking_text = thinking_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in thinking_text:
-                thinking_text = thinking_text.split("```")[1].split("```")[0].strip()
+            fence = FENCE_RE.search(thinking_text)
+            if fence:
+                thinking_text = fence.group(1)
             
             plan = json.loads(thinking_text)
             
@@ -1658,18 +2016,7 @@ CRITICAL: For "{task}" - if it's about LISTING/SHOWING/DISPLAYING → MUST use s
             tool = self._decide_tool(action, full_context)
 
         # Normalize common synonyms from AI outputs
-        tool_map = {
-            'execute_shell_command': 'shell_command',
-            'execute_shell_commands': 'shell_command',
-            'shell': 'shell_command',
-            'shell_commands': 'shell_command',
-            'file_operations': 'file_operation',
-            'file': 'file_operation',
-            'files': 'file_operation',
-            'screenshot_capture': 'screenshot',
-            'capture_screenshot': 'screenshot',
-        }
-        tool = tool_map.get(str(tool).strip().lower(), tool)
+        tool = TOOL_SYNONYMS.get(str(tool).strip().lower(), tool)
         
         self._send_update(
             AgentStatus.EXECUTING,
@@ -1684,15 +2031,9 @@ CRITICAL: For "{task}" - if it's about LISTING/SHOWING/DISPLAYING → MUST use s
         
         # Route to appropriate tool
         try:
-            if tool == 'shell_command':
-                result = self._execute_shell_command(action, full_context)
-            elif tool == 'file_operation':
-                result = self._execute_file_operation(action, full_context)
-            elif tool == 'screenshot':
-                result = self._take_screenshot(action, full_context)
-            else:
-                # Use AI to figure out how to execute
-                result = self._ai_execute(action, full_context)
+            # Unknown tools: use AI to figure out how to execute
+            handler = self._tool_handlers.get(tool, self._ai_execute)
+            result = handler(action, full_context)
             
             self._log_execution("STEP_SUCCESS", {
                 "tool": tool,
@@ -1737,53 +2078,51 @@ CRITICAL: For "{task}" - if it's about LISTING/SHOWING/DISPLAYING → MUST use s
             "bytes_written": len(text_content)
         }
     
-    def _decide_tool(self, action: str, context: Dict[str, Any]) -> str:
-        """Use AI to decide which tool to use"""
-        
-        # Quick keyword matching for common cases
-        action_lower = action.lower()
-        
+    @staticmethod
+    def _keyword_tool(action_lower: str) -> Optional[str]:
+        """Quick keyword matching for common cases - None when the model has to decide"""
         # Screenshot keywords - HIGHEST PRIORITY
-        if any(word in action_lower for word in ['screenshot', 'capture screen', 'screen grab', 'take picture of screen']):
+        if SCREENSHOT_ACTION_RE.search(action_lower):
             return 'screenshot'
         
         # File operation keywords
-        if any(word in action_lower for word in ['create file', 'create folder', 'make directory', 'mkdir', 'touch']):
+        if FILE_ACTION_RE.search(action_lower):
             return 'file_operation'
         
         # Shell command keywords
-        if any(word in action_lower for word in ['list', 'ls', 'find', 'grep', 'check', 'show', 'ps', 'kill']):
+        if SHELL_ACTION_RE.search(action_lower):
             return 'shell_command'
+        return None
+    
+    def _decide_tool(self, action: str, context: Dict[str, Any]) -> str:
+        """Use AI to decide which tool to use"""
+        
+        # Quick keyword matching for common cases
+        action_lower = action.lower()
+        keyword_tool = self._keyword_tool(action_lower)
+        if keyword_tool:
+            return keyword_tool
+        
+        # Same prompt inputs -> same decision, skip the model round-trip
+        cache_key = (" ".join(action_lower.split()), context.get('cwd'), context.get('os'), context.get('desktop'))
+        cached_tool = self._cache_get(self._tool_cache, cache_key)
+        if cached_tool:
+            return cached_tool
         
         # If no clear match, ask AI
-        prompt = f"""Given this action: "{action}"
-Current Context:
-- Working Directory: {context.get('cwd', 'unknown')}
-- OS: {context.get('os', 'unknown')}
-- Desktop: {context.get('desktop', 'unknown')}
-
-Which tool should be used? Choose from:
-- shell_command: Execute terminal/bash commands (ls, cd, grep, find, ps, etc.)
-- file_operation: Create, read, update, delete files and directories (PREFERRED for file/folder creation)
-- screenshot: Capture screen (for screenshot/screen capture tasks)
-- process_management: Kill/start processes
-
-CRITICAL RULES: 
-- For ANY screenshot/screen capture → MUST use "screenshot"
-- For "create file" or "create folder" → use file_operation
-- For "list", "show", "check", "find" → use shell_command
-
-Respond with just the tool name, nothing else."""
+        prompt = DECIDE_TOOL_PROMPT.format_map(PromptFields(context, default='unknown', action=action))
 
         try:
             response = self._get_execution_model().generate_content(prompt)
             tool = response.text.strip().lower().replace(' ', '_')
             self._log_execution("TOOL_DECISION", {"action": action, "tool": tool})
+            if tool in KNOWN_TOOLS:
+                self._cache_put(self._tool_cache, cache_key, tool)
             return tool
         except Exception as e:
             self._log_execution("TOOL_DECISION_ERROR", {"error": str(e)})
             # Default to file_operation if action contains "create" or "file"
-            if "create" in action.lower() and ("file" in action.lower() or "folder" in action.lower()):
+            if "create" in action_lower and ("file" in action_lower or "folder" in action_lower):
                 return 'file_operation'
             return 'shell_command'
     
@@ -1791,63 +2130,45 @@ Respond with just the tool name, nothing else."""
         """Execute a shell command intelligently with proper working directory"""
         
         # Use AI to generate the actual command with context awareness
-        prompt = f"""Generate a safe bash command to accomplish: "{action}"
-
-Current System Context:
-- Working Directory: {context.get('cwd')}
-- Home Directory: {context.get('home')}
-- Desktop: {context.get('desktop')}
-- OS: {context.get('os')}
-- Shell: {context.get('shell')}
-
-Important Rules:
-1. Generate ONLY the command, no explanation
-2. Use absolute paths when working with files
-3. DO NOT add || true or || echo to commands - let failures fail naturally
-4. For file creation, use touch or echo > file
-5. For directory creation, use mkdir -p
-6. Safe to execute (no rm -rf /, no dangerous operations)
-7. If action mentions "desktop", use: {context.get('desktop')}
-8. If action mentions "home", use: {context.get('home')}
-9. Return CLEAN commands only - no error suppression
-
-Examples:
-- "create a file test.txt on desktop" → touch {context.get('desktop')}/test.txt
-- "list files" → ls -la {context.get('cwd')}
-- "check disk space" → df -h
-- "show current directory" → pwd
-
-Command:"""
+        prompt = SHELL_COMMAND_PROMPT.format_map(PromptFields(context, action=action))
 
+        # Same action in the same context -> reuse the command that worked last time
+        cache_key = (" ".join(action.split()), context.get('cwd'), context.get('home'),
+                     context.get('desktop'), context.get('os'), context.get('shell'))
+        
         try:
-            response = self._get_execution_model().generate_content(prompt)
-            command = response.text.strip()
-            
-            # Remove markdown code blocks if present
-            if '```' in command:
-                lines = command.split('\n')
-                command_lines = []
-                in_code_block = False
-                for line in lines:
-                    if line.strip().startswith('```'):
-                        in_code_block = not in_code_block
-                        continue
-                    if in_code_block or not line.strip().startswith('```'):
-                        command_lines.append(line)
-                command = '\n'.join(command_lines).strip()
-            
-            # Remove any remaining bash/sh prefix
-            if command.startswith('bash') or command.startswith('sh'):
-                command = ' '.join(command.split()[1:])
-            
-            # CRITICAL: Remove error suppression that AI might add
-            # Remove || true, || echo, etc.
-            if '||' in command:
-                # Only keep the part before ||
-                command = command.split('||')[0].strip()
-            
-            # Remove trailing ; or && that might cause issues
-            command = command.rstrip(';').strip()
+            command = self._cache_get(self._command_cache, cache_key)
+            if command is None:
+                response = self._get_execution_model().generate_content(prompt)
+                command = response.text.strip()
+                
+                # Remove markdown code blocks if present
+                if '```' in command:
+                    lines = command.split('\n')
+                    command_lines = []
+                    in_code_block = False
+                    for line in lines:
+                        if line.strip().startswith('```'):
+                            in_code_block = not in_code_block
+                            continue
+                        if in_code_block or not line.strip().startswith('```'):
+                            command_lines.append(line)
+                    command = '\n'.join(command_lines).strip()
+                
+                # Remove any remaining bash/sh prefix
+                if command.startswith('bash') or command.startswith('sh'):
+                    command = ' '.join(command.split()[1:])
+                
+                # CRITICAL: Remove error suppression that AI might add
+                # Remove || true, || echo, etc.
+                if '||' in command:
+                    # Only keep the part before ||
+                    command = command.split('||')[0].strip()
+                
+                # Remove trailing ; or && that might cause issues
+                command = command.rstrip(';').strip()
+                
+                self._cache_put(self._command_cache, cache_key, command)
             
             self._send_update(
                 AgentStatus.EXECUTING,
@@ -1860,15 +2181,8 @@ Command:"""
             })
             
             # Execute the command with proper working directory
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=60,
-                cwd=context.get('cwd'),
-                env=self.context_engine.env_vars
-            )
+            # env=None: the command inherits the live process environment
+            result = run_shell(command, timeout=60, cwd=context.get('cwd'))
             
             output = result.stdout.strip()
             error = result.stderr.strip()
@@ -1910,10 +2224,12 @@ Command:"""
                 raise Exception(f"Command failed (exit {result.returncode}): {error or 'Unknown error'}")
                 
         except subprocess.TimeoutExpired:
+            self._cache_discard(self._command_cache, cache_key)
             error_msg = "Command timeout - took longer than 60 seconds"
             self._log_execution("SHELL_TIMEOUT", {"command": command})
             raise Exception(error_msg)
         except Exception as e:
+            self._cache_discard(self._command_cache, cache_key)
             self._log_execution("SHELL_ERROR", {"error": str(e)})
             raise Exception(f"Shell command error: {str(e)}")
     
@@ -1921,48 +2237,24 @@ Command:"""
         """Execute file operations intelligently with context-aware path resolution"""
         
         # Use AI to determine the file operation with full context
-        prompt = f"""Analyze this file operation request: "{action}"
-
-Current System Context:
-- Working Directory: {context.get('cwd')}
-- Home Directory: {context.get('home')}
-- Desktop: {context.get('desktop')}
-- Documents: {context.get('documents')}
-- Downloads: {context.get('downloads')}
-
-Provide a JSON response for the file operation:
-{{
-    "operation": "create|read|update|delete|copy|move|mkdir",
-    "path": "/absolute/path/to/file or directory",
-    "content": "content if creating/updating file",
-    "destination": "destination path if copying/moving"
-}}
-
-Path Resolution Rules:
-- If action says "desktop" or "on desktop": use {context.get('desktop')}/filename
-- If action says "documents": use {context.get('documents')}/filename  
-- If action says "home": use {context.get('home')}/filename
-- If relative path given: use {context.get('cwd')}/filename
-- Always use absolute paths
-
-Examples:
-- "create a file test.txt on desktop" → {{"operation": "create", "path": "{context.get('desktop')}/test.txt", "content": ""}}
-- "create folder MyFolder on desktop" → {{"operation": "mkdir", "path": "{context.get('desktop')}/MyFolder"}}
-- "read file data.json" → {{"operation": "read", "path": "{context.get('cwd')}/data.json"}}
-
-JSON Response:"""
+        prompt = FILE_OPERATION_PROMPT.format_map(PromptFields(context, action=action))
 
+        cache_key = (" ".join(action.split()), context.get('cwd'), context.get('home'),
+                     context.get('desktop'), context.get('documents'), context.get('downloads'))
+        
         try:
-            response = self._get_execution_model().generate_content(prompt)
-            op_text = response.text.strip()
-            
-            # Extract JSON from response
-            if "```json" in op_text:
-                op_text = op_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in op_text:
-                op_text = op_text.split("```")[1].split("```")[0].strip()
-            
-            operation = json.loads(op_text)
+            operation = self._cache_get(self._file_op_cache, cache_key)
+            if operation is None:
+                response = self._get_execution_model(schema=FILE_OPERATION_SCHEMA).generate_content(prompt)
+                op_text = response.text.strip()
+                
+                # Providers without structured output may still wrap the JSON in a fence
+                fence = FENCE_RE.search(op_text)
+                if fence:
+                    op_text = fence.group(1)
+                
+                operation = json.loads(op_text)
+                self._cache_put(self._file_op_cache, cache_key, operation)
             
             op_type = str(operation.get('operation', '')).strip().lower()
             raw_path = str(operation.get('path', '')).strip()
@@ -2029,11 +2321,15 @@ JSON Response:"""
                 if not path.exists():
                     raise Exception(f"File not found: {path}")
                 
-                content = path.read_text()
+                # Only the head of large files goes into the result (and the websocket payload)
+                with path.open(errors='replace') as f:
+                    content = f.read(MAX_READ_CHARS)
+                    truncated = bool(f.read(1))
+                size = path.stat().st_size
                 
                 self._send_update(
                     AgentStatus.EXECUTING,
-                    f"✅ Read file: {path} ({len(content)} bytes)"
+                    f"✅ Read file: {path} ({size} bytes{f', first {len(content)} characters' if truncated else ''})"
                 )
                 
                 return {
@@ -2041,7 +2337,9 @@ JSON Response:"""
                     "operation": "read",
                     "path": str(path),
                     "content": content,
-                    "size": len(content)
+                    "size": size,  # bytes on disk
+                    "chars": len(content),  # characters returned in content
+                    "truncated": truncated
                 }
             
             elif op_type == 'update':
@@ -2092,10 +2390,14 @@ JSON Response:"""
                 dest = Path(self.context_engine.resolve_path(dest_path))
                 dest.parent.mkdir(parents=True, exist_ok=True)
                 
+                # Reflink clone where the filesystem supports it, byte copy otherwise
+                cloned = False
                 if path.is_file():
-                    shutil.copy2(path, dest)
+                    cloned = clone_file(path, dest)
+                    if not cloned:
+                        shutil.copy2(path, dest)
                 elif path.is_dir():
-                    shutil.copytree(path, dest, dirs_exist_ok=True)
+                    shutil.copytree(path, dest, dirs_exist_ok=True, copy_function=copy_file)
                 
                 self._send_update(
                     AgentStatus.EXECUTING,
@@ -2107,7 +2409,8 @@ JSON Response:"""
                     "operation": "copied",
                     "from": str(path),
                     "to": str(dest),
-                    "exists": dest.exists()
+                    "exists": dest.exists(),
+                    "cloned": cloned
                 }
             
             elif op_type == 'move':
@@ -2140,6 +2443,7 @@ JSON Response:"""
             self._log_execution("FILE_OPERATION_JSON_ERROR", {"error": str(e), "text": op_text})
             raise Exception(f"Failed to parse file operation JSON: {str(e)}")
         except Exception as e:
+            self._cache_discard(self._file_op_cache, cache_key)
             self._log_execution("FILE_OPERATION_ERROR", {"error": str(e)})
             raise Exception(f"File operation error: {str(e)}")
     
@@ -2167,70 +2471,22 @@ JSON Response:"""
             )
             
             # Try multiple methods in order of preference
-            screenshot_taken = False
-            error_msg = ""
+            # Method 1: mss (reads the framebuffer directly, no PIL round-trip)
+            screenshot_taken, error_msg = self._grab_screen(filepath)
             
-            # Method 1: Try PIL/Pillow ImageGrab
-            try:
-                from PIL import ImageGrab
-                screenshot = ImageGrab.grab()
-                screenshot.save(str(filepath))
-                screenshot_taken = True
-            except Exception as e1:
-                error_msg = f"PIL ImageGrab failed: {str(e1)}"
-                
-                # Method 2: Try using gnome-screenshot command
+            if not screenshot_taken:
+                # Method 2: Try PIL/Pillow ImageGrab
                 try:
-                    result = subprocess.run(
-                        ['gnome-screenshot', '-f', str(filepath)],
-                        capture_output=True,
-                        text=True,
-                        timeout=5
-                    )
-                    if result.returncode == 0 and filepath.exists():
-                        screenshot_taken = True
-                    else:
-                        error_msg += f" | gnome-screenshot failed: {result.stderr}"
-                except FileNotFoundError:
-                    error_msg += " | gnome-screenshot not installed"
-                except Exception as e2:
-                    error_msg += f" | gnome-screenshot error: {str(e2)}"
-                
-                # Method 3: Try using scrot command
-                if not screenshot_taken:
-                    try:
-                        result = subprocess.run(
-                            ['scrot', str(filepath)],
-                            capture_output=True,
-                            text=True,
-                            timeout=5
-                        )
-                        if result.returncode == 0 and filepath.exists():
-                            screenshot_taken = True
-                        else:
-                            error_msg += f" | scrot failed: {result.stderr}"
-                    except FileNotFoundError:
-                        error_msg += " | scrot not installed"
-                    except Exception as e3:
-                        error_msg += f" | scrot error: {str(e3)}"
+                    from PIL import ImageGrab
+                    screenshot = ImageGrab.grab()
+                    screenshot.save(str(filepath))
+                    screenshot_taken = True
+                except Exception as e1:
+                    error_msg += f" | PIL ImageGrab failed: {str(e1)}"
                 
-                # Method 4: Try ImageMagick's import command
-                if not screenshot_taken:
-                    try:
-                        result = subprocess.run(
-                            ['import', '-window', 'root', str(filepath)],
-                            capture_output=True,
-                            text=True,
-                            timeout=5
-                        )
-                        if result.returncode == 0 and filepath.exists():
-                            screenshot_taken = True
-                        else:
-                            error_msg += f" | imagemagick failed: {result.stderr}"
-                    except FileNotFoundError:
-                        error_msg += " | imagemagick not installed"
-                    except Exception as e4:
-                        error_msg += f" | imagemagick error: {str(e4)}"
+                    # Methods 3-5: installed CLI tools (gnome-screenshot, scrot, imagemagick)
+                    screenshot_taken, cli_error = self._capture_with_cli(filepath)
+                    error_msg += cli_error
             
             if not screenshot_taken:
                 raise Exception(f"All screenshot methods failed. {error_msg}\nPlease install one of: gnome-screenshot, scrot, or imagemagick")
@@ -2273,74 +2529,35 @@ JSON Response:"""
     def _ai_execute(self, action: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Use AI to figure out how to execute an unknown action with context awareness"""
         
-        prompt = f"""You need to accomplish this task: "{action}"
-
-Current System Context:
-- Working Directory: {context.get('cwd')}
-- Home Directory: {context.get('home')}
-- Desktop: {context.get('desktop')}
-- OS: {context.get('os')}
-
-Think about how to do this safely. Provide a Python code snippet that:
-1. Uses absolute paths (available in context dict)
-2. Creates parent directories if needed
-3. Handles errors gracefully
-4. Returns a result dict with 'success' and relevant info
-
-Available in namespace: os, subprocess, Path, shutil, context
-
-Example for "create file test.txt on desktop":
-```python
-from pathlib import Path
-target = Path(context['desktop']) / 'test.txt'
-target.parent.mkdir(parents=True, exist_ok=True)
-target.write_text("")
-result = {{"success": True, "path": str(target), "created": True}}
-```
-
-Respond with ONLY the Python code, nothing else."""
+        prompt = AI_EXECUTE_PROMPT.format_map(PromptFields(context, action=action))
 
         try:
-            response = self._get_execution_model().generate_content(prompt)
-            code = response.text.strip()
+            response = self._get_execution_model(schema=AI_EXECUTE_SCHEMA).generate_content(prompt)
+            decision_text = response.text.strip()
             
-            # Extract code from markdown
-            if "```python" in code:
-                code = code.split("```python")[1].split("```")[0].strip()
-            elif "```" in code:
-                code = code.split("```")[1].split("```")[0].strip()
+            fence = FENCE_RE.search(decision_text)
+            if fence:
+                decision_text = fence.group(1)
+            
+            decision = json.loads(decision_text)
+            tool = TOOL_SYNONYMS.get(str(decision.get('tool', '')).strip().lower(), decision.get('tool'))
+            handler = self._tool_handlers.get(tool)
+            if handler is None:
+                raise Exception(f"Unsupported tool: {tool}")
+            tool_action = str(decision.get('action') or action)
             
             self._send_update(
                 AgentStatus.EXECUTING,
-                f"🤖 Executing AI-generated solution..."
+                f"🤖 Routing to {tool}: {tool_action}"
             )
             
             self._log_execution("AI_EXECUTE", {
                 "action": action,
-                "code": code[:200]  # Log first 200 chars
+                "tool": tool,
+                "tool_action": tool_action
             })
             
-            # Execute in controlled environment with context
-            namespace = {
-                'os': os,
-                'subprocess': subprocess,
-                'Path': Path,
-                'shutil': shutil,
-                'context': context,
-                'result': None
-            }
-            
-            exec(code, namespace)
-            result = namespace.get('result')
-            
-            # If no result was set, try to infer success
-            if result is None:
-                result = {
-                    "success": True,
-                    "action": action,
-                    "method": "ai_generated_code",
-                    "note": "Code executed but no explicit result returned"
-                }
+            result = handler(tool_action, context)
             
             self._send_update(
                 AgentStatus.EXECUTING,
@@ -2350,7 +2567,8 @@ Respond with ONLY the Python code, nothing else."""
             return {
                 "success": True,
                 "action": action,
-                "method": "ai_generated_code",
+                "method": "ai_dispatch",
+                "tool": tool,
                 "result": result
             }
             
@@ -2360,8 +2578,8 @@ Respond with ONLY the Python code, nothing else."""
     
     def get_execution_log(self) -> List[Dict[str, Any]]:
         """Get execution log for debugging"""
-        return self.execution_log
+        return list(self.execution_log)
     
     def clear_execution_log(self):
         """Clear execution log"""
-        self.execution_log = []
+        self.execution_log.clear()
@@ -9,7 +9,7 @@ import json
 import time
 import logging
 from typing import Dict, Any, List, Optional
-from .agent_core import IntelligentAgent, AgentStatus
+from .agent_core import IntelligentAgent, AgentStatus, FENCE_RE, dumps_context
 import asyncio
 import threading
 
@@ -185,7 +185,7 @@ class WebAgent(IntelligentAgent):
         """Use AI to decide web action type"""
         
         prompt = f"""Web task: "{action}"
-Context: {json.dumps(context, indent=2)}
+Context: {dumps_context(context)}
 
 Choose action type:
 - navigate: Go to a URL
@@ -283,14 +283,13 @@ Page content (truncated):
 Provide the extracted information in JSON format."""
 
             try:
-                response = self._get_thinking_model().generate_content(prompt)
+                response = self._get_thinking_model(json_mode=True).generate_content(prompt)
                 info_text = response.text.strip()
                 
                 # Parse JSON from response
-                if "```json" in info_text:
-                    info_text = info_text.split("```json")[1].split("```")[0].strip()
-                elif "```" in info_text:
-                    info_text = info_text.split("```")[1].split("```")[0].strip()
+                fence = FENCE_RE.search(info_text)
+                if fence:
+                    info_text = fence.group(1)
                 
                 extracted = json.loads(info_text)
                 logger.info(f"✅ Extraction successful")
@@ -389,7 +388,7 @@ Respond with ONLY Python code using 'page' variable."""
         try:
             prompt = f"""Accomplish this web task: "{action}"
 Current URL: {self.page.url if self.page else 'No page loaded'}
-Context: {json.dumps(context, indent=2) if context else '{}'}
+Context: {dumps_context(context) if context else '{}'}
 
 Provide Playwright code to do this. Use the 'page' object.
 Respond with ONLY Python code."""
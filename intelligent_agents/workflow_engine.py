@@ -4,6 +4,7 @@ Atlas-Style Workflow Engine for SIGMA-OS
 Execute multi-step workflows with AI-powered task execution
 """
 
+import re
 import json
 import time
 import logging
@@ -13,6 +14,8 @@ from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.S)
+
 class WorkflowStatus(Enum):
     PENDING = "pending"
     RUNNING = "running"
@@ -195,10 +198,9 @@ Respond with ONLY valid JSON matching this structure."""
             workflow_data = response.text.strip()
             
             # Clean up JSON
-            if "```json" in workflow_data:
-                workflow_data = workflow_data.split("```json")[1].split("```")[0].strip()
-            elif "```" in workflow_data:
-                workflow_data = workflow_data.split("```")[1].split("```")[0].strip()
+            fence = _FENCE_RE.search(workflow_data)
+            if fence:
+                workflow_data = fence.group(1)
             
             data = json.loads(workflow_data)
             
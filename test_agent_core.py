@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test script for the IntelligentAgent plan cache (driven by a stub model) and context serialization
+"""
+
+import sys
+import os
+import json
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from intelligent_agents.agent_core import IntelligentAgent, dumps_context
+from intelligent_agents.system_agent import SystemAgent
+
+PLAN = {
+    "understanding": "stub",
+    "approach": "stub",
+    "steps": [
+        {"step": 1, "action": "first", "tool": "shell_command"},
+        {"step": 2, "action": "second", "tool": "shell_command"},
+    ],
+}
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Answers every prompt with PLAN and counts the planning calls"""
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        return StubResponse(json.dumps(PLAN))
+
+
+class StubModelManager:
+    def __init__(self):
+        self.model = StubModel()
+
+    def get_thinking_model(self, json_mode=False, schema=None):
+        return self.model
+
+    def get_execution_model(self, json_mode=False, schema=None):
+        return self.model
+
+
+class StubStepsMixin:
+    """execute_step answers with the configured success flag instead of doing anything"""
+    step_success = True
+
+    def execute_step(self, step, context=None):
+        return {"success": self.step_success, "action": step.get("action")}
+
+
+class StubAgent(StubStepsMixin, IntelligentAgent):
+    def __init__(self):
+        super().__init__(name="StubAgent", capabilities=["stub"])
+        self.model_manager = StubModelManager()
+
+
+class StubSystemAgent(StubStepsMixin, SystemAgent):
+    def __init__(self):
+        super().__init__()
+        self.model_manager = StubModelManager()
+
+
+def test_identical_task_hits_cache():
+    """A second identical task reuses the plan instead of asking the model"""
+    print("\n🧪 Identical task reuses the cached plan...")
+    agent = StubAgent()
+    agent.run("Do  the THING", {"to": "a@example.com"})
+    agent.run("do the thing", {"to": "a@example.com"})
+    assert agent.model_manager.model.calls == 1, agent.model_manager.model.calls
+    print("✅ One planning call for two runs")
+
+
+def test_failed_run_not_cached():
+    """A run whose steps report success False leaves no plan behind"""
+    print("\n🧪 Failed run is not cached...")
+    agent = StubAgent()
+    agent.step_success = False
+    agent.run("do the thing")
+    assert not agent.plan_cache
+    agent.step_success = True
+    agent.run("do the thing")
+    assert agent.model_manager.model.calls == 2, agent.model_manager.model.calls
+    print("✅ Failed plan was planned again")
+
+
+def test_different_context_misses_cache():
+    """Same task text with a different context (e.g. another email body) is planned again"""
+    print("\n🧪 Different context misses the cache...")
+    agent = StubAgent()
+    agent.run("send the email", {"body": "first"})
+    agent.run("send the email", {"body": "second"})
+    assert agent.model_manager.model.calls == 2, agent.model_manager.model.calls
+    agent.run("send the email", {"body": "first"})
+    assert agent.model_manager.model.calls == 2, agent.model_manager.model.calls
+    print("✅ Context is part of the key")
+
+
+def test_system_agent_cwd_and_failures():
+    """SystemAgent plans are keyed on cwd and only cached when every step succeeds"""
+    print("\n🧪 SystemAgent plan cache (cwd + success)...")
+    agent = StubSystemAgent()
+    engine = agent.context_engine
+    original_cwd = engine.cwd
+    try:
+        with tempfile.TemporaryDirectory() as other_dir:
+            agent.step_success = False
+            agent._smart_execute("tidy this folder", {})
+            assert not agent.plan_cache
+
+            agent.step_success = True
+            agent._smart_execute("tidy this folder", {})
+            agent._smart_execute("tidy this folder", {})
+            assert agent.model_manager.model.calls == 2, agent.model_manager.model.calls
+
+            engine.set_cwd(other_dir)
+            agent._smart_execute("tidy this folder", {})
+            assert agent.model_manager.model.calls == 3, agent.model_manager.model.calls
+
+            agent._smart_execute("tidy this folder", {"extra": "context"})
+            assert agent.model_manager.model.calls == 4, agent.model_manager.model.calls
+            engine.set_cwd(original_cwd)  # leave the temp dir before it is removed
+    finally:
+        engine.set_cwd(original_cwd)
+    print("✅ Different cwd or context is planned again")
+
+
+def test_dumps_context_keeps_value_types():
+    """True, 1 and 1.0 hash alike but must not share a memoized dump"""
+    print("\n🧪 dumps_context keeps value types apart...")
+    assert dumps_context({"a": 1}) == json.dumps({"a": 1}, indent=2)
+    assert dumps_context({"a": True}) != dumps_context({"a": 1})
+    assert dumps_context({"a": True}) == json.dumps({"a": True}, indent=2)
+    assert dumps_context({"a": 1.0}) == json.dumps({"a": 1.0}, indent=2)
+    assert dumps_context({"a": [1, {"b": 2}]}) == json.dumps({"a": [1, {"b": 2}]}, indent=2)
+    print("✅ Each value dumped as its own type")
+
+
+if __name__ == "__main__":
+    test_identical_task_hits_cache()
+    test_failed_run_not_cached()
+    test_different_context_misses_cache()
+    test_system_agent_cwd_and_failures()
+    test_dumps_context_keeps_value_types()
+    print("\n🎉 All agent core tests passed")
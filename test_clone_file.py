@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test script for the reflink copy helpers used by the system agent's copy operation
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from intelligent_agents import system_agent
+from intelligent_agents.system_agent import clone_file, copy_file
+
+CONTENT = b"important data\n"
+
+
+def _write_source(tmp_dir):
+    src = os.path.join(tmp_dir, "source.txt")
+    with open(src, "wb") as f:
+        f.write(CONTENT)
+    return src
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class _ByteCopyIoctl:
+    """Stands in for fcntl on filesystems without FICLONE, so the clone path runs"""
+    @staticmethod
+    def ioctl(dst_fd, request, src_fd):
+        assert request == system_agent.FICLONE
+        os.lseek(src_fd, 0, os.SEEK_SET)
+        os.write(dst_fd, os.read(src_fd, 1 << 20))
+
+
+def _with_fake_clone(test):
+    real_fcntl = system_agent.fcntl
+    system_agent.fcntl = _ByteCopyIoctl
+    try:
+        test()
+    finally:
+        system_agent.fcntl = real_fcntl
+
+
+def test_copy_to_new_file():
+    """A plain copy produces an identical file"""
+    print("\n🧪 Copy to a new file...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        src = _write_source(tmp_dir)
+        dst = os.path.join(tmp_dir, "copy.txt")
+        copy_file(src, dst)
+        assert _read(dst) == CONTENT
+        assert _read(src) == CONTENT
+        assert not [name for name in os.listdir(tmp_dir) if name.startswith(".clone-")]
+    print("✅ Copied")
+
+
+def test_same_file_keeps_source():
+    """Copying a file onto itself must not truncate it"""
+    print("\n🧪 Copy a file onto itself...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        src = _write_source(tmp_dir)
+        assert clone_file(src, src) is False
+        try:
+            copy_file(src, src)
+        except shutil.SameFileError:
+            pass
+        else:
+            raise AssertionError("copy_file onto itself should raise SameFileError")
+        assert _read(src) == CONTENT
+    print("✅ Source intact, SameFileError raised")
+
+
+def test_symlink_to_source_keeps_source():
+    """Copying onto a symlink that points back at the source must not truncate it"""
+    print("\n🧪 Copy onto a symlink to the source...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        src = _write_source(tmp_dir)
+        link = os.path.join(tmp_dir, "link.txt")
+        os.symlink(src, link)
+        assert clone_file(src, link) is False
+        try:
+            copy_file(src, link)
+        except shutil.SameFileError:
+            pass
+        else:
+            raise AssertionError("copy_file onto a symlink to itself should raise SameFileError")
+        assert _read(src) == CONTENT
+        assert os.path.islink(link)
+    print("✅ Source intact, symlink untouched")
+
+
+def test_clone_to_new_file():
+    """A successful clone creates the file with the source's metadata"""
+    print("\n🧪 Clone to a new file...")
+
+    def run():
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src = _write_source(tmp_dir)
+            os.chmod(src, 0o640)
+            dst = os.path.join(tmp_dir, "clone.txt")
+            assert clone_file(src, dst) is True
+            assert _read(dst) == CONTENT
+            assert os.stat(dst).st_mode & 0o777 == 0o640
+
+    _with_fake_clone(run)
+    print("✅ Cloned")
+
+
+def test_overwrite_existing_writes_in_place():
+    """An existing destination is overwritten in place like copy2 - hard links survive"""
+    print("\n🧪 Copy over an existing, hard-linked file...")
+
+    def run():
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src = _write_source(tmp_dir)
+            dst = os.path.join(tmp_dir, "existing.txt")
+            with open(dst, "wb") as f:
+                f.write(b"old contents that are longer than the new ones\n")
+            link = os.path.join(tmp_dir, "hardlink.txt")
+            os.link(dst, link)
+            inode = os.stat(dst).st_ino
+
+            assert clone_file(src, dst) is False
+            copy_file(src, dst)
+            assert os.stat(dst).st_ino == inode
+            assert _read(dst) == CONTENT
+            assert _read(link) == CONTENT
+
+    _with_fake_clone(run)
+    print("✅ Written in place, hard link kept")
+
+
+def test_overwrite_read_only_raises():
+    """A read-only destination is refused like copy2 instead of being replaced"""
+    print("\n🧪 Copy over a read-only file...")
+    if hasattr(os, "geteuid") and os.geteuid() == 0:
+        print("⚠️  Skipped - root ignores file permissions")
+        return
+
+    def run():
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src = _write_source(tmp_dir)
+            dst = os.path.join(tmp_dir, "readonly.txt")
+            with open(dst, "wb") as f:
+                f.write(b"keep me\n")
+            os.chmod(dst, 0o444)
+            try:
+                copy_file(src, dst)
+            except PermissionError:
+                pass
+            else:
+                raise AssertionError("copy_file over a read-only file should raise PermissionError")
+            assert _read(dst) == b"keep me\n"
+
+    _with_fake_clone(run)
+    print("✅ PermissionError raised, file untouched")
+
+
+if __name__ == "__main__":
+    test_copy_to_new_file()
+    test_same_file_keeps_source()
+    test_symlink_to_source_keeps_source()
+    test_clone_to_new_file()
+    test_overwrite_existing_writes_in_place()
+    test_overwrite_read_only_raises()
+    print("\n🎉 All clone tests passed")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Test script for command routing between the system, email and web agents
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.app import _route_command
+
+ROUTING_CASES = [
+    # Shell commands that merely mention a URL or a mail-ish word stay on system
+    ("run docker compose up -d", "system"),
+    ("git clone https://github.com/x/y.git", "system"),
+    ("curl -I https://example.com", "system"),
+    ("list files in downloads", "system"),
+    # Email
+    ("check my gmail inbox", "email"),
+    ("send an email to bob@example.com", "email"),
+    ("send the report to bob@example.com", "email"),
+    # Web
+    ("search the web for python tutorials", "web"),
+    ("open https://example.com", "web"),
+    ("go to https://news.ycombinator.com and read the top story", "web"),
+]
+
+
+def test_route_command():
+    """Each command lands on the expected agent"""
+    print("\n🧪 Testing command routing...")
+    print("=" * 60)
+
+    for command, expected in ROUTING_CASES:
+        agent = _route_command(command)
+        status = "✅" if agent == expected else "❌"
+        print(f"{status} {command!r} -> {agent} (expected {expected})")
+        assert agent == expected, f"{command!r} routed to {agent}, expected {expected}"
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    test_route_command()